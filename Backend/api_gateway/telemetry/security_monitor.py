@@ -7,6 +7,7 @@ import time
 import logging
 from typing import Dict, List, Optional, Any
 from collections import defaultdict, deque
+from itertools import islice
 from datetime import datetime, timedelta
 import ipaddress
 
@@ -34,6 +35,9 @@ class SecurityMonitor:
         
         # Rate limiting tracking
         self.request_counts: Dict[str, deque] = defaultdict(lambda: deque(maxlen=1000))
+        self.rate_buckets: Dict[str, List[float]] = {}  # client_ip -> [tokens, last_refill]
+        self.idle_sweep_interval = 60  # seconds between idle-client eviction passes
+        self._last_idle_sweep = time.monotonic()
         
         logger.info("✅ Security Monitor initialized")
     
@@ -180,31 +184,67 @@ class SecurityMonitor:
         
         # Check rate limiting
         self._check_rate_limiting(client_ip)
+        
+        # Periodically drop state for clients that have gone quiet
+        if time.monotonic() - self._last_idle_sweep >= self.idle_sweep_interval:
+            self._evict_idle_clients()
     
     def _check_rate_limiting(self, client_ip: str):
-        """Check for rate limiting violations"""
+        """Check for rate limiting violations using a per-IP token bucket"""
         
-        current_time = time.time()
+        now = time.monotonic()
         time_window = 60  # 1 minute window
         max_requests = self.auth_thresholds['suspicious_rate_limit']
         
-        # Count requests in last minute
-        recent_requests = [
-            event for event in self.request_counts[client_ip]
-            if current_time - event['timestamp'] <= time_window
+        # Lazily refill tokens at max_requests per window, capped at one window's burst
+        bucket = self.rate_buckets.get(client_ip)
+        if bucket is None:
+            bucket = self.rate_buckets[client_ip] = [float(max_requests), now]
+        else:
+            bucket[0] = min(max_requests, bucket[0] + (now - bucket[1]) * max_requests / time_window)
+            bucket[1] = now
+        
+        if bucket[0] >= 1.0:
+            bucket[0] -= 1.0
+            return
+        
+        recent_requests = islice(reversed(self.request_counts[client_ip]), 10)
+        self.record_security_violation(
+            'rate_limit_exceeded',
+            client_ip,
+            {
+                'limit': max_requests,
+                'endpoints': list(set(req['endpoint'] for req in recent_requests))
+            },
+            severity='high'
+        )
+    
+    def _evict_idle_clients(self):
+        """Evict per-IP rate state that no longer affects any check"""
+        
+        now = time.monotonic()
+        current_time = time.time()
+        self._last_idle_sweep = now
+        
+        # Buckets idle for two windows are full again, identical to a fresh bucket
+        bucket_idle = 2 * 60
+        idle_buckets = [
+            ip for ip, bucket in self.rate_buckets.items()
+            if now - bucket[1] >= bucket_idle
+        ]
+        for ip in idle_buckets:
+            del self.rate_buckets[ip]
+        
+        # Request history only feeds the last-hour reputation view
+        idle_histories = [
+            ip for ip, events in self.request_counts.items()
+            if not events or current_time - events[-1]['timestamp'] > 3600
         ]
+        for ip in idle_histories:
+            del self.request_counts[ip]
         
-        if len(recent_requests) > max_requests:
-            self.record_security_violation(
-                'rate_limit_exceeded',
-                client_ip,
-                {
-                    'requests_per_minute': len(recent_requests),
-                    'limit': max_requests,
-                    'endpoints': list(set(req['endpoint'] for req in recent_requests[-10:]))
-                },
-                severity='high'
-            )
+        if idle_buckets or idle_histories:
+            logger.debug(f"Evicted rate state for {len(idle_buckets)} buckets, {len(idle_histories)} histories")
     
     def get_security_summary(self) -> Dict[str, Any]:
         """Get comprehensive security summary"""
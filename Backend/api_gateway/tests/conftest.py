@@ -0,0 +1,8 @@
+"""
+Test configuration - make the service packages importable from the service root
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
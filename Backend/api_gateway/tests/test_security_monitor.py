@@ -0,0 +1,77 @@
+"""
+Security Monitor tests - token bucket rate checks against the sliding window
+"""
+
+import pytest
+
+from telemetry import security_monitor
+from telemetry.security_monitor import SecurityMonitor
+
+LIMIT = 100
+WINDOW = 60
+
+class FakeClock:
+    """Drives both time.time() and time.monotonic() inside the monitor"""
+    
+    def __init__(self):
+        self.now = 1000.0
+    
+    def time(self):
+        return self.now
+    
+    def monotonic(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(security_monitor, 'time', fake)
+    return fake
+
+def _sliding_window_flags(timestamps):
+    """The original check: flag a request when more than LIMIT fall in the last minute"""
+    flags = []
+    for index, now in enumerate(timestamps):
+        recent = [t for t in timestamps[max(0, index - 999):index + 1] if now - t <= WINDOW]
+        flags.append(len(recent) > LIMIT)
+    return flags
+
+def _token_bucket_flags(clock, timestamps):
+    monitor = SecurityMonitor()
+    flags = []
+    for now in timestamps:
+        clock.now = now
+        before = len(monitor.security_violations)
+        monitor.record_request("10.0.0.1", "/api/v1/localize", "POST")
+        flags.append(len(monitor.security_violations) > before)
+    return flags
+
+def _burst(start, count):
+    return [start + i * 0.001 for i in range(count)]
+
+@pytest.mark.parametrize("timestamps", [
+    # 101st request inside one minute is the first one flagged
+    _burst(1000.0, 150),
+    # Exactly at the limit
+    _burst(1000.0, LIMIT),
+    # Steady traffic below the limit
+    [1000.0 + i for i in range(600)],
+    # A full burst again once the previous one has left the window
+    _burst(1000.0, LIMIT) + _burst(1061.0, LIMIT + 5),
+], ids=["burst", "at-limit", "steady", "burst-after-quiet-window"])
+def test_token_bucket_matches_sliding_window(clock, timestamps):
+    assert _token_bucket_flags(clock, timestamps) == _sliding_window_flags(timestamps)
+
+def test_sustained_overload_is_flagged_after_burst_credit(clock):
+    # Known divergence: 120 requests/minute trips the sliding window within a
+    # minute, while the bucket first spends its one-window burst credit
+    timestamps = [1000.0 + i * 0.5 for i in range(1200)]
+    
+    bucket_flags = _token_bucket_flags(clock, timestamps)
+    window_flags = _sliding_window_flags(timestamps)
+    
+    first_window = window_flags.index(True)
+    first_bucket = bucket_flags.index(True)
+    assert timestamps[first_window] - timestamps[0] <= WINDOW
+    # Drains at 2 - 100/60 tokens per second from a full bucket of LIMIT
+    assert timestamps[first_bucket] - timestamps[0] == pytest.approx(LIMIT / (2 - LIMIT / WINDOW), abs=5.0)
@@ -8,7 +8,7 @@ import asyncio
 import uuid
 from datetime import datetime, timedelta
 from typing import Optional, List, Dict, Any
-import json
+import orjson
 
 from fastapi import APIRouter, HTTPException, Depends, WebSocket, WebSocketDisconnect, BackgroundTasks
 from fastapi.responses import JSONResponse
@@ -372,14 +372,20 @@ async def websocket_sync(websocket: WebSocket):
         while True:
             try:
                 data = await websocket.receive_text()
-                message = json.loads(data)
+                
+                # Reject oversized frames before paying for a full decode
+                if len(data) > settings.WS_MAX_MESSAGE_SIZE:
+                    logger.warning(f"Oversized message ({len(data)} chars) from client {client_id}")
+                    continue
+                
+                message = orjson.loads(data)
                 
                 if sync_manager:
                     await sync_manager.handle_message(client_id, message)
                 
             except WebSocketDisconnect:
                 break
-            except json.JSONDecodeError:
+            except orjson.JSONDecodeError:
                 logger.warning(f"Invalid JSON from client {client_id}")
             except Exception as e:
                 logger.error(f"Error handling WebSocket message: {e}")
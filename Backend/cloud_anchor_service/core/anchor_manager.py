@@ -5,16 +5,17 @@ Handles creation, tracking, and persistence of spatial anchors
 
 import logging
 import asyncio
+import time
 import uuid
 from typing import Dict, List, Optional, Any, Tuple
 from datetime import datetime, timedelta
 import numpy as np
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass
 import json
 
 logger = logging.getLogger(__name__)
 
-@dataclass
+@dataclass(slots=True)
 class SpatialAnchor:
     """Spatial anchor data structure"""
     id: str
@@ -32,13 +33,21 @@ class SpatialAnchor:
     
     def to_dict(self) -> Dict[str, Any]:
         """Convert to dictionary for serialization"""
-        data = asdict(self)
-        # Convert datetime objects to ISO strings
-        data['created_at'] = self.created_at.isoformat()
-        data['updated_at'] = self.updated_at.isoformat()
-        if self.expires_at:
-            data['expires_at'] = self.expires_at.isoformat()
-        return data
+        # Built field by field: asdict() deep-copies recursively on every broadcast
+        return {
+            'id': self.id,
+            'session_id': self.session_id,
+            'user_id': self.user_id,
+            'position': list(self.position),
+            'rotation': list(self.rotation),
+            'confidence': self.confidence,
+            'tracking_state': self.tracking_state,
+            'anchor_type': self.anchor_type,
+            'metadata': dict(self.metadata),
+            'created_at': self.created_at.isoformat(),
+            'updated_at': self.updated_at.isoformat(),
+            'expires_at': self.expires_at.isoformat() if self.expires_at else None
+        }
 
 @dataclass
 class AnchorQuery:
@@ -277,7 +286,6 @@ class AnchorManager:
     async def query_anchors(self, query: AnchorQuery) -> List[SpatialAnchor]:
         """Query anchors based on spatial and attribute criteria"""
         try:
-            import time
             start_time = time.time()
             
             # Get base anchor set
@@ -5,20 +5,30 @@ WebSocket-based real-time updates and conflict resolution
 
 import logging
 import asyncio
-import json
+import orjson
 from typing import Dict, List, Set, Optional, Any, Callable
 from datetime import datetime, timedelta
 import weakref
-from dataclasses import asdict
 
 from .anchor_manager import SpatialAnchor, AnchorManager
 
 logger = logging.getLogger(__name__)
 
+# Match the payloads json.dumps(default=str) produced: non-string keys are
+# coerced to strings instead of raising, datetimes still go through str()
+# rather than orjson's RFC 3339 form, and numpy values become JSON numbers
+_ORJSON_OPTIONS = (orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+                   | orjson.OPT_PASSTHROUGH_DATETIME)
+
+def _dumps_message(message: Dict[str, Any]) -> str:
+    """Serialize an outgoing WebSocket message"""
+    return orjson.dumps(message, default=str, option=_ORJSON_OPTIONS).decode()
+
 class SyncClient:
     """Represents a connected client for synchronization"""
     
-    def __init__(self, client_id: str, user_id: str, session_id: str, websocket):
+    def __init__(self, client_id: str, user_id: str, session_id: str, websocket,
+                 send_queue_size: int = 256):
         self.client_id = client_id
         self.user_id = user_id
         self.session_id = session_id
@@ -26,6 +36,10 @@ class SyncClient:
         self.subscribed_anchors: Set[str] = set()
         self.last_heartbeat = datetime.utcnow()
         self.is_active = True
+        
+        # Outbound messages are drained by a dedicated writer task
+        self.send_queue: asyncio.Queue = asyncio.Queue(maxsize=send_queue_size)
+        self.writer_task: Optional[asyncio.Task] = None
 
 class SynchronizationManager:
     """
@@ -41,12 +55,16 @@ class SynchronizationManager:
         self.session_clients: Dict[str, Set[str]] = {}  # session_id -> client_ids
         self.user_clients: Dict[str, Set[str]] = {}     # user_id -> client_ids
         
+        # Per-session client snapshots for broadcast, rebuilt only on join/leave
+        self.session_snapshots: Dict[str, tuple] = {}
+        
         # Synchronization configuration
         self.config = {
             'heartbeat_interval': 30,  # seconds
             'client_timeout': 90,      # seconds
             'max_clients_per_session': 50,
             'sync_batch_size': 100,
+            'send_queue_size': 256,    # pending outbound messages per client
             'conflict_resolution': 'last_writer_wins'
         }
         
@@ -60,9 +78,20 @@ class SynchronizationManager:
             'conflicts_resolved': 0
         }
         
+        # Message type -> handler dispatch table, built once
+        self._message_handlers: Dict[str, Callable] = {
+            'heartbeat': self._handle_heartbeat,
+            'anchor_created': self._handle_anchor_created,
+            'anchor_updated': self._handle_anchor_updated,
+            'anchor_deleted': self._handle_anchor_deleted,
+            'subscribe_anchor': self._handle_subscribe_anchor,
+            'unsubscribe_anchor': self._handle_unsubscribe_anchor
+        }
+        
         # Background tasks
         self.heartbeat_task = None
         self.cleanup_task = None
+        self._disconnect_tasks: Set[asyncio.Task] = set()
         self.is_initialized = False
 
     async def initialize(self) -> None:
@@ -92,13 +121,16 @@ class SynchronizationManager:
                     return False
             
             # Create client
-            client = SyncClient(client_id, user_id, session_id, websocket)
+            client = SyncClient(client_id, user_id, session_id, websocket,
+                                send_queue_size=self.config['send_queue_size'])
+            client.writer_task = asyncio.create_task(self._client_writer(client))
             self.clients[client_id] = client
             
             # Update session tracking
             if session_id not in self.session_clients:
                 self.session_clients[session_id] = set()
             self.session_clients[session_id].add(client_id)
+            self._refresh_session_snapshot(session_id)
             
             # Update user tracking
             if user_id not in self.user_clients:
@@ -127,11 +159,16 @@ class SynchronizationManager:
             if not client:
                 return False
             
+            client.is_active = False
+            if client.writer_task:
+                client.writer_task.cancel()
+            
             # Remove from session tracking
             if client.session_id in self.session_clients:
                 self.session_clients[client.session_id].discard(client_id)
                 if not self.session_clients[client.session_id]:
                     del self.session_clients[client.session_id]
+                self._refresh_session_snapshot(client.session_id)
             
             # Remove from user tracking
             if client.user_id in self.user_clients:
@@ -149,6 +186,14 @@ class SynchronizationManager:
             logger.error(f"Failed to unregister client {client_id}: {e}")
             return False
 
+    def _refresh_session_snapshot(self, session_id: str):
+        """Rebuild the broadcast snapshot for a session after membership changes"""
+        client_ids = self.session_clients.get(session_id)
+        if client_ids:
+            self.session_snapshots[session_id] = tuple(self.clients[cid] for cid in client_ids)
+        else:
+            self.session_snapshots.pop(session_id, None)
+
     async def handle_message(self, client_id: str, message: Dict[str, Any]) -> None:
         """Handle incoming message from client"""
         try:
@@ -161,32 +206,17 @@ class SynchronizationManager:
             self.stats['messages_received'] += 1
             
             message_type = message.get('type')
+            handler = self._message_handlers.get(message_type)
             
-            if message_type == 'heartbeat':
-                await self._handle_heartbeat(client)
-            
-            elif message_type == 'anchor_created':
-                await self._handle_anchor_created(client, message)
-            
-            elif message_type == 'anchor_updated':
-                await self._handle_anchor_updated(client, message)
-            
-            elif message_type == 'anchor_deleted':
-                await self._handle_anchor_deleted(client, message)
-            
-            elif message_type == 'subscribe_anchor':
-                await self._handle_subscribe_anchor(client, message)
-            
-            elif message_type == 'unsubscribe_anchor':
-                await self._handle_unsubscribe_anchor(client, message)
-            
+            if handler:
+                await handler(client, message)
             else:
                 logger.warning(f"Unknown message type: {message_type}")
                 
         except Exception as e:
             logger.error(f"Error handling message from {client_id}: {e}")
 
-    async def _handle_heartbeat(self, client: SyncClient):
+    async def _handle_heartbeat(self, client: SyncClient, message: Dict[str, Any]):
         """Handle heartbeat message"""
         response = {
             'type': 'heartbeat_ack',
@@ -364,40 +394,75 @@ class SynchronizationManager:
                 'timestamp': datetime.utcnow().isoformat()
             }
             
-            # Send to session clients
-            session_clients = self.session_clients.get(anchor.session_id, set())
+            # Serialize once for every recipient
+            message_json = _dumps_message(message)
             
-            tasks = []
-            for client_id in session_clients:
-                if client_id == exclude_client:
+            # Send to session clients
+            sent = 0
+            for client in self.session_snapshots.get(anchor.session_id, ()):
+                if client.client_id == exclude_client:
                     continue
                 
-                client = self.clients.get(client_id)
-                if client and client.is_active:
+                if client.is_active:
                     # Check if client is subscribed to this anchor
                     if update_type == 'anchor_deleted' or anchor.id in client.subscribed_anchors:
-                        tasks.append(self._send_to_client(client, message))
+                        self._send_payload(client, message_json)
+                        sent += 1
             
-            # Send concurrently
-            if tasks:
-                await asyncio.gather(*tasks, return_exceptions=True)
-                self.stats['messages_sent'] += len(tasks)
+            self.stats['messages_sent'] += sent
             
         except Exception as e:
             logger.error(f"Failed to broadcast anchor update: {e}")
 
     async def _send_to_client(self, client: SyncClient, message: Dict[str, Any]):
         """Send message to specific client"""
+        self._send_payload(client, _dumps_message(message))
+
+    def _send_payload(self, client: SyncClient, message_json: str):
+        """Queue an already serialized message for a client's writer task"""
+        if not client.is_active:
+            return
+        
         try:
-            if not client.is_active:
-                return
-            
-            message_json = json.dumps(message, default=str)
-            await client.websocket.send_text(message_json)
-            
+            client.send_queue.put_nowait(message_json)
+        except asyncio.QueueFull:
+            # Slow consumer: drop it rather than stall the sender
+            logger.warning(f"Send queue full for client {client.client_id}, disconnecting")
+            self._disconnect_client(client, "Send queue overflow")
+
+    async def _client_writer(self, client: SyncClient):
+        """Drain a client's send queue onto its WebSocket"""
+        try:
+            while True:
+                message_json = await client.send_queue.get()
+                await client.websocket.send_text(message_json)
+                
+        except asyncio.CancelledError:
+            pass
         except Exception as e:
             logger.error(f"Failed to send message to client {client.client_id}: {e}")
-            client.is_active = False
+            self._disconnect_client(client, "Send failed")
+
+    def _disconnect_client(self, client: SyncClient, reason: str):
+        """Stop serving a client at once and schedule its close and unregistration"""
+        if not client.is_active:
+            return
+        
+        client.is_active = False
+        if client.writer_task and client.writer_task is not asyncio.current_task():
+            client.writer_task.cancel()
+        
+        task = asyncio.create_task(self._close_client(client, reason))
+        self._disconnect_tasks.add(task)
+        task.add_done_callback(self._disconnect_tasks.discard)
+
+    async def _close_client(self, client: SyncClient, reason: str):
+        """Close a dropped client's WebSocket and remove it from its session"""
+        try:
+            await client.websocket.close(code=1008, reason=reason)
+        except Exception:
+            pass
+        await self.unregister_client(client.client_id)
 
     async def _send_error(self, client: SyncClient, error_type: str, error_message: str):
         """Send error message to client"""
@@ -491,8 +556,10 @@ class SynchronizationManager:
             tasks = [self.heartbeat_task, self.cleanup_task]
             await asyncio.gather(*[t for t in tasks if t], return_exceptions=True)
             
-            # Close all client connections
+            # Stop writers and close all client connections
             for client in self.clients.values():
+                if client.writer_task:
+                    client.writer_task.cancel()
                 try:
                     await client.websocket.close()
                 except Exception:
@@ -500,6 +567,7 @@ class SynchronizationManager:
             
             self.clients.clear()
             self.session_clients.clear()
+            self.session_snapshots.clear()
             self.user_clients.clear()
             
             logger.info("Synchronization Manager shutdown complete")
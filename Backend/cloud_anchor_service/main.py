@@ -224,6 +224,8 @@ if __name__ == "__main__":
         host="0.0.0.0",
         port=settings.PORT,
         reload=settings.ENVIRONMENT == "development",
+        loop="uvloop",
+        http="httptools",
         log_level=settings.LOG_LEVEL.lower(),
         access_log=True
     )
\ No newline at end of file
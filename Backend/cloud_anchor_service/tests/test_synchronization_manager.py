@@ -0,0 +1,109 @@
+"""
+Synchronization Manager tests - client disconnect handling and wire format
+"""
+
+import asyncio
+import json
+from datetime import datetime
+
+import numpy as np
+import orjson
+
+from core.anchor_manager import SpatialAnchor
+from core.synchronization_manager import SynchronizationManager, _dumps_message
+
+class FakeWebSocket:
+    """Minimal WebSocket stand-in recording sends and closes"""
+    
+    def __init__(self, fail_sends: bool = False, block_sends: bool = False):
+        self.fail_sends = fail_sends
+        self.block_sends = block_sends
+        self.sent = []
+        self.close_code = None
+    
+    async def send_text(self, text: str):
+        if self.fail_sends:
+            raise ConnectionError("socket gone")
+        if self.block_sends:
+            await asyncio.Event().wait()
+        self.sent.append(text)
+    
+    async def close(self, code: int = 1000, reason: str = ""):
+        self.close_code = code
+
+class FakeAnchorManager:
+    async def get_session_anchors(self, session_id):
+        return []
+
+async def _register(manager, websocket, client_id="c1"):
+    assert await manager.register_client(client_id, "u1", "s1", websocket)
+    return manager.clients[client_id]
+
+def test_queue_overflow_closes_and_unregisters_client():
+    async def run():
+        manager = SynchronizationManager(FakeAnchorManager())
+        manager.config['send_queue_size'] = 2
+        websocket = FakeWebSocket(block_sends=True)
+        client = await _register(manager, websocket)
+        
+        for _ in range(5):
+            manager._send_payload(client, "{}")
+        await asyncio.sleep(0)
+        await asyncio.gather(*manager._disconnect_tasks)
+        
+        assert websocket.close_code == 1008
+        assert client.writer_task.cancelled() or client.writer_task.done()
+        assert "c1" not in manager.clients
+        assert "s1" not in manager.session_clients
+        assert "s1" not in manager.session_snapshots
+    
+    asyncio.run(run())
+
+def test_send_failure_closes_and_unregisters_client():
+    async def run():
+        manager = SynchronizationManager(FakeAnchorManager())
+        websocket = FakeWebSocket(fail_sends=True)
+        client = await _register(manager, websocket)
+        
+        manager._send_payload(client, "{}")
+        await client.writer_task
+        await asyncio.gather(*manager._disconnect_tasks)
+        
+        assert not client.is_active
+        assert websocket.close_code == 1008
+        assert "c1" not in manager.clients
+        assert "s1" not in manager.session_clients
+    
+    asyncio.run(run())
+
+def _anchor_update_message():
+    created = datetime(2024, 5, 1, 12, 30, 15, 250000)
+    anchor = SpatialAnchor(
+        id="a1",
+        session_id="s1",
+        user_id="u1",
+        position=[np.float64(1.25), np.float64(-0.5), np.float64(3.0)],
+        rotation=[0.0, 0.7071, 0.0, 0.7071],
+        confidence=np.float64(0.93),
+        tracking_state="tracking",
+        anchor_type="shared",
+        metadata={"label": "Café entrance", 7: "floor", "seen_at": created, "tags": ["door", None]},
+        created_at=created,
+        updated_at=created,
+    )
+    return {
+        'type': 'anchor_updated',
+        'anchor': anchor.to_dict(),
+        'pose': {'position': [1.25, -0.5, 3.0], 'timestamp': created},
+        'timestamp': created.isoformat()
+    }
+
+def test_message_wire_format_matches_json_dumps():
+    message = _anchor_update_message()
+    
+    assert orjson.loads(_dumps_message(message)) == json.loads(json.dumps(message, default=str))
+
+def test_numpy_arrays_serialize_as_numbers():
+    message = {'type': 'pose', 'position': np.array([1.0, 2.0, 3.0], dtype=np.float32)}
+    
+    assert orjson.loads(_dumps_message(message)) == {'type': 'pose', 'position': [1.0, 2.0, 3.0]}
@@ -56,6 +56,7 @@ class Settings(BaseSettings):
     WS_CLIENT_TIMEOUT: int = Field(default=90, description="WebSocket client timeout in seconds")
     MAX_CLIENTS_PER_SESSION: int = Field(default=50, description="Maximum WebSocket clients per session")
     SYNC_BATCH_SIZE: int = Field(default=100, description="Synchronization batch size")
+    WS_MAX_MESSAGE_SIZE: int = Field(default=65536, description="Maximum inbound WebSocket message size in characters")
     
     # Performance settings
     MAX_QUERY_RADIUS: float = Field(default=1000.0, description="Maximum query radius in meters")
@@ -214,15 +214,17 @@ class NakamaLoadTester:
                             if "timestamp" in payload:
                                 latency = (receive_time - payload["timestamp"]) * 1000
                                 metrics.latencies.append(latency)
-                        except:
+                        except (ValueError, TypeError):
+                            # Malformed or non-numeric payload; skip latency sample
                             pass
                 
             except asyncio.TimeoutError:
                 continue
+            except websockets.exceptions.ConnectionClosedOK:
+                break
             except Exception as e:
-                if "normal" not in str(e).lower():
-                    print(f"Receive error: {e}")
-                    metrics.errors += 1
+                print(f"Receive error: {e}")
+                metrics.errors += 1
                 break
     
     async def run_load_test(self, num_users: int = 8, duration_seconds: int = 30):
@@ -42,6 +42,9 @@ local function create_match_state()
         session_id = nk.uuid_v4(),
         creation_time = os.time(),
         players = {},  -- user_id -> player data
+        join_order = {},  -- user_ids in join order (next host is first)
+        colocalized_ids = {},  -- user_ids of colocalized players
+        colocalized_presences = {},  -- matching presences, pose broadcast recipients
         anchors = {},  -- anchor_id -> anchor data
         host_user_id = nil,
         colocalization_method = "qr_code",
@@ -57,10 +60,12 @@ local function create_match_state()
 end
 
 -- Player structure (replaces Player dataclass)
-local function create_player(user_id, username, is_host)
+local function create_player(presence, is_host)
+    local user_id = presence.user_id
     return {
         user_id = user_id,
-        username = username,
+        username = presence.username,
+        presence = presence,
         pose = nil,  -- Will be set on first update
         join_time = os.time(),
         is_host = is_host,
@@ -83,6 +88,20 @@ local function create_anchor(id, position, rotation, metadata, creator_id)
     }
 end
 
+-- Rebuild pose recipients; only runs when colocalization or membership changes
+local function refresh_colocalized(state)
+    local ids = {}
+    local presences = {}
+    for user_id, player in pairs(state.players) do
+        if player.colocalized then
+            table.insert(ids, user_id)
+            table.insert(presences, player.presence)
+        end
+    end
+    state.colocalized_ids = ids
+    state.colocalized_presences = presences
+end
+
 -- Match initialization (called when match is created)
 local function match_init(context, setupstate)
     local state = create_match_state()
@@ -115,22 +134,45 @@ local function match_join_attempt(context, dispatcher, tick, state, presence, me
     return state, true
 end
 
+-- Drop a departed player from the join order
+local function remove_from_join_order(state, user_id)
+    for i, uid in ipairs(state.join_order) do
+        if uid == user_id then
+            table.remove(state.join_order, i)
+            return
+        end
+    end
+end
+
 -- Handle player joined (add to session)
 local function match_join(context, dispatcher, tick, state, presences)
     for _, presence in ipairs(presences) do
         local user_id = presence.user_id
         local username = presence.username
         
-        -- First player becomes host
+        -- First player becomes host; a host rejoining keeps the role
         local is_host = false
         if not state.host_user_id then
             state.host_user_id = user_id
             is_host = true
+        elseif state.host_user_id == user_id then
+            is_host = true
+        end
+        
+        -- A second session of a joined user replaces the first, so drop the
+        -- old join order entry and its presence from the pose recipients
+        local replaced = state.players[user_id]
+        if replaced then
+            remove_from_join_order(state, user_id)
         end
         
         -- Create player
-        local player = create_player(user_id, username, is_host)
+        local player = create_player(presence, is_host)
         state.players[user_id] = player
+        table.insert(state.join_order, user_id)
+        if replaced and replaced.colocalized then
+            refresh_colocalized(state)
+        end
         
         -- Notify all players about new user
         local join_msg = {
@@ -179,7 +221,12 @@ local function match_leave(context, dispatcher, tick, state, presences)
         
         if state.players[user_id] then
             -- Remove player
+            local was_colocalized = state.players[user_id].colocalized
             state.players[user_id] = nil
+            remove_from_join_order(state, user_id)
+            if was_colocalized then
+                refresh_colocalized(state)
+            end
             
             -- Notify remaining players
             local leave_msg = {
@@ -191,14 +238,13 @@ local function match_leave(context, dispatcher, tick, state, presences)
             
             -- Handle host transfer if host left
             if state.host_user_id == user_id then
+                -- Earliest remaining joiner becomes host; skip ids that no
+                -- longer have a player entry
                 local new_host = nil
-                local earliest_join = nil
-                
-                -- Find player who joined earliest
-                for uid, player in pairs(state.players) do
-                    if not earliest_join or player.join_time < earliest_join then
-                        earliest_join = player.join_time
+                for _, uid in ipairs(state.join_order) do
+                    if state.players[uid] then
                         new_host = uid
+                        break
                     end
                 end
                 
@@ -297,11 +343,13 @@ end
 
 -- Broadcast pose updates to colocalized players
 function broadcast_pose_updates(state, dispatcher)
-    -- Collect all updated poses
+    -- Collect updated poses from colocalized players only
     local pose_updates = {}
+    local players = state.players
     
-    for user_id, player in pairs(state.players) do
-        if player.pose_updated and player.colocalized then
+    for _, user_id in ipairs(state.colocalized_ids) do
+        local player = players[user_id]
+        if player.pose_updated then
             pose_updates[user_id] = player.pose
             player.pose_updated = false
         end
@@ -316,15 +364,7 @@ function broadcast_pose_updates(state, dispatcher)
         }
         
         -- Send only to colocalized players
-        local colocalized_presences = {}
-        for user_id, player in pairs(state.players) do
-            if player.colocalized then
-                -- Note: In production, you'd map user_id to presence objects
-                -- This is simplified for the example
-            end
-        end
-        
-        dispatcher.broadcast_message(OP_CODES.POSE_UPDATE, nk.json_encode(msg))
+        dispatcher.broadcast_message(OP_CODES.POSE_UPDATE, nk.json_encode(msg), state.colocalized_presences)
     end
 end
 
@@ -436,7 +476,10 @@ function handle_colocalization_data(state, dispatcher, user_id, data)
     
     -- Mark user as colocalized
     if data.colocalized ~= nil then
-        player.colocalized = data.colocalized
+        if player.colocalized ~= data.colocalized then
+            player.colocalized = data.colocalized
+            refresh_colocalized(state)
+        end
         
         -- Notify other players about colocalization status
         local msg = {
@@ -493,6 +536,7 @@ function cleanup_inactive_players(state, dispatcher)
     for _, user_id in ipairs(players_to_remove) do
         if state.players[user_id] then
             state.players[user_id] = nil
+            remove_from_join_order(state, user_id)
             
             -- Notify other players
             local msg = {
@@ -503,6 +547,10 @@ function cleanup_inactive_players(state, dispatcher)
             dispatcher.broadcast_message(OP_CODES.SESSION_STATE, nk.json_encode(msg))
         end
     end
+    
+    if #players_to_remove > 0 then
+        refresh_colocalized(state)
+    end
 end
 
 -- Handle match termination
@@ -17,18 +17,28 @@ class NakamaAuthTester:
         self.nakama_port = nakama_port
         self.base_url = f"http://{nakama_host}:{nakama_port}"
         
+        # RPC endpoints and headers are constant for the tester's lifetime
+        self._create_session_url = f"{self.base_url}/v2/rpc/create_anonymous_session"
+        self._join_session_url = f"{self.base_url}/v2/rpc/join_with_session_code"
+        self._session_stats_url = f"{self.base_url}/v2/rpc/get_session_stats"
+        self._cleanup_sessions_url = f"{self.base_url}/v2/rpc/cleanup_expired_sessions"
+        self._headers = {"Content-Type": "application/json"}
+        
+    async def _post(self, url: str, payload: Dict[str, Any]) -> requests.Response:
+        """POST to a Nakama RPC without blocking the event loop"""
+        return await asyncio.to_thread(requests.post, url, json=payload, headers=self._headers)
+        
     async def test_anonymous_session_creation(self) -> Dict[str, Any]:
         """Test creating anonymous session with 6-character code"""
         print("Testing anonymous session creation...")
         
         try:
             # Call Nakama RPC for anonymous session creation
-            response = requests.post(
-                f"{self.base_url}/v2/rpc/create_anonymous_session",
-                json={
+            response = await self._post(
+                self._create_session_url,
+                {
                     "display_name": "TestPlayer"
-                },
-                headers={"Content-Type": "application/json"}
+                }
             )
             
             if response.status_code == 200:
@@ -56,13 +66,12 @@ class NakamaAuthTester:
         print(f"Testing join with code: {session_code}")
         
         try:
-            response = requests.post(
-                f"{self.base_url}/v2/rpc/join_with_session_code",
-                json={
+            response = await self._post(
+                self._join_session_url,
+                {
                     "code": session_code,
                     "display_name": "JoiningPlayer"
-                },
-                headers={"Content-Type": "application/json"}
+                }
             )
             
             if response.status_code == 200:
@@ -83,10 +92,9 @@ class NakamaAuthTester:
         print("Testing session statistics...")
         
         try:
-            response = requests.post(
-                f"{self.base_url}/v2/rpc/get_session_stats",
-                json={},
-                headers={"Content-Type": "application/json"}
+            response = await self._post(
+                self._session_stats_url,
+                {}
             )
             
             if response.status_code == 200:
@@ -106,10 +114,9 @@ class NakamaAuthTester:
         print("Testing session cleanup...")
         
         try:
-            response = requests.post(
-                f"{self.base_url}/v2/rpc/cleanup_expired_sessions",
-                json={},
-                headers={"Content-Type": "application/json"}
+            response = await self._post(
+                self._cleanup_sessions_url,
+                {}
             )
             
             if response.status_code == 200:
@@ -136,15 +143,14 @@ class NakamaAuthTester:
             "ABCDEF"    # All letters
         ]
         
-        for code in invalid_codes:
+        async def probe(code: str):
             try:
-                response = requests.post(
-                    f"{self.base_url}/v2/rpc/join_with_session_code",
-                    json={
+                response = await self._post(
+                    self._join_session_url,
+                    {
                         "code": code,
                         "display_name": "TestPlayer"
-                    },
-                    headers={"Content-Type": "application/json"}
+                    }
                 )
                 
                 if response.status_code != 200:
@@ -154,6 +160,9 @@ class NakamaAuthTester:
                     
             except Exception as e:
                 print(f"✅ Exception for invalid code {code}: {e}")
+        
+        # Probes are independent, so issue them concurrently
+        await asyncio.gather(*(probe(code) for code in invalid_codes))
     
     async def run_full_test_suite(self):
         """Run complete authentication migration test suite"""
@@ -174,11 +183,12 @@ class NakamaAuthTester:
             print("❌ Critical failure: Cannot join with valid code")
             return False
         
-        # Test 3: Session statistics
-        await self.test_session_stats()
-        
-        # Test 4: Invalid code handling
-        await self.test_invalid_code_handling()
+        # Tests 3 & 4: Session statistics and invalid code handling are
+        # independent of each other, so run them concurrently
+        await asyncio.gather(
+            self.test_session_stats(),
+            self.test_invalid_code_handling()
+        )
         
         # Test 5: Session cleanup
         await self.test_session_cleanup()
@@ -5,15 +5,21 @@ RESTful API endpoints for visual positioning system
 
 import logging
 import asyncio
+import time
 from datetime import datetime
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Literal, Tuple, AsyncIterator
 import numpy as np
 import cv2
-import base64
-from io import BytesIO
-from PIL import Image
+import shutil
+import tempfile
+from contextlib import aclosing
 
-from fastapi import APIRouter, HTTPException, UploadFile, File, Form, BackgroundTasks, Depends
+try:
+    import pybase64 as base64
+except ImportError:
+    import base64
+
+from fastapi import APIRouter, HTTPException, UploadFile, File, Form, Query, Request, BackgroundTasks, Depends
 from fastapi.responses import JSONResponse
 from pydantic import BaseModel, Field, validator
 
@@ -23,6 +29,7 @@ from pathlib import Path
 sys.path.append(str(Path(__file__).parent.parent))
 
 from core.vps_engine import VPSEngine
+from core.pose_estimator import PoseEstimator
 from utils.auth import verify_api_key
 from utils.config import settings
 
@@ -31,10 +38,19 @@ logger = logging.getLogger(__name__)
 # Create router
 router = APIRouter(tags=["VPS Engine"])
 
+# Shared pose converter; matrix_to_pose_components holds no per-request state
+_POSE_ESTIMATOR = PoseEstimator()
+
+# Supported image payload encodings; raw_* are packed 8-bit, 3-channel frames
+ImageFormat = Literal["jpeg", "png", "raw_rgb8", "raw_bgr8"]
+
 # Pydantic models
 class LocalizationRequest(BaseModel):
     """Request model for VPS localization"""
     image_base64: str = Field(..., description="Base64 encoded image")
+    image_format: ImageFormat = Field("jpeg", description="Encoding of the image payload")
+    width: Optional[int] = Field(None, gt=0, description="Frame width in pixels (raw formats only)")
+    height: Optional[int] = Field(None, gt=0, description="Frame height in pixels (raw formats only)")
     camera_intrinsics: List[List[float]] = Field(..., description="3x3 camera intrinsic matrix")
     approximate_latitude: Optional[float] = Field(None, description="Approximate GPS latitude")
     approximate_longitude: Optional[float] = Field(None, description="Approximate GPS longitude")
@@ -66,6 +82,7 @@ class MapUploadRequest(BaseModel):
     location_latitude: Optional[float] = Field(None, description="Map location latitude")
     location_longitude: Optional[float] = Field(None, description="Map location longitude")
     description: Optional[str] = Field(None, description="Map description")
+    keyframe_stride: int = Field(15, ge=1, description="Keep every Nth frame of reference videos")
 
 class StatusResponse(BaseModel):
     """Response model for service status"""
@@ -85,6 +102,31 @@ def get_vps_engine():
         raise HTTPException(status_code=503, detail="VPS Engine not initialized")
     return vps_engine
 
+def _decode_image(image_data: bytes, image_format: str = "jpeg",
+                  width: Optional[int] = None, height: Optional[int] = None) -> np.ndarray:
+    """
+    Decode an image payload into a BGR array.
+    Raw frames are wrapped without invoking a decoder.
+    """
+    buffer = np.frombuffer(image_data, dtype=np.uint8)
+    
+    if image_format in ("raw_rgb8", "raw_bgr8"):
+        if not width or not height:
+            raise ValueError("width and height are required for raw image formats")
+        if buffer.size != width * height * 3:
+            raise ValueError(
+                f"Raw image size mismatch: expected {width * height * 3} bytes, got {buffer.size}"
+            )
+        image_np = buffer.reshape(height, width, 3)
+        if image_format == "raw_rgb8":
+            image_np = cv2.cvtColor(image_np, cv2.COLOR_RGB2BGR)
+        return image_np
+    
+    image_np = cv2.imdecode(buffer, cv2.IMREAD_COLOR)
+    if image_np is None:
+        raise ValueError("could not decode image")
+    return image_np
+
 @router.post("/localize", response_model=LocalizationResponse)
 async def localize_image(
     request: LocalizationRequest,
@@ -96,13 +138,12 @@ async def localize_image(
     Returns 6DOF camera pose with confidence metrics
     """
     try:
-        start_time = datetime.utcnow()
+        start_time = time.perf_counter()
         
-        # Decode base64 image
+        # Decode base64 image (kept in OpenCV's native BGR order)
         try:
-            image_data = base64.b64decode(request.image_base64)
-            image = Image.open(BytesIO(image_data))
-            image_np = np.array(image.convert('RGB'))
+            image_data = base64.b64decode(request.image_base64, validate=False)
+            image_np = _decode_image(image_data, request.image_format, request.width, request.height)
         except Exception as e:
             raise HTTPException(status_code=400, detail=f"Invalid image data: {e}")
         
@@ -127,11 +168,9 @@ async def localize_image(
             logger.warning(f"Localization quality below threshold: {result.quality_score}")
         
         # Convert pose to readable format
-        from core.pose_estimator import PoseEstimator
-        pose_estimator = PoseEstimator()
-        pose_components = pose_estimator.matrix_to_pose_components(result.pose)
+        pose_components = _POSE_ESTIMATOR.matrix_to_pose_components(result.pose)
         
-        processing_time = (datetime.utcnow() - start_time).total_seconds()
+        processing_time = time.perf_counter() - start_time
         
         return LocalizationResponse(
             success=True,
@@ -146,6 +185,8 @@ async def localize_image(
             message="Localization successful"
         )
         
+    except HTTPException:
+        raise
     except ValueError as e:
         logger.warning(f"Localization failed: {e}")
         return LocalizationResponse(
@@ -157,6 +198,80 @@ async def localize_image(
         logger.error(f"Localization error: {e}")
         raise HTTPException(status_code=500, detail=f"Localization failed: {e}")
 
+async def _localize_payload(
+    engine: VPSEngine,
+    image_data: bytes,
+    camera_intrinsics: str,
+    approximate_latitude: Optional[float],
+    approximate_longitude: Optional[float],
+    map_id: Optional[str],
+    image_format: str = "jpeg",
+    width: Optional[int] = None,
+    height: Optional[int] = None
+) -> LocalizationResponse:
+    """Decode an image payload, localize it and build the response"""
+    import json
+    
+    try:
+        image_np = _decode_image(image_data, image_format, width, height)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid image data: {e}")
+    
+    # Parse camera intrinsics
+    try:
+        intrinsics_data = json.loads(camera_intrinsics)
+        camera_intrinsics_np = np.array(intrinsics_data, dtype=np.float32)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Invalid camera intrinsics: {e}")
+    
+    # Prepare approximate location
+    approximate_location = None
+    if approximate_latitude is not None and approximate_longitude is not None:
+        approximate_location = (approximate_latitude, approximate_longitude)
+    
+    # Perform localization
+    result = await engine.localize(
+        image=image_np,
+        camera_intrinsics=camera_intrinsics_np,
+        approximate_location=approximate_location,
+        map_id=map_id
+    )
+    
+    # Convert pose to readable format
+    pose_components = _POSE_ESTIMATOR.matrix_to_pose_components(result.pose)
+    
+    return LocalizationResponse(
+        success=True,
+        pose=pose_components,
+        confidence=result.confidence,
+        error_estimate=result.error_estimate,
+        processing_time=result.processing_time,
+        map_id=result.map_id,
+        feature_matches=result.feature_matches,
+        quality_score=result.quality_score,
+        timestamp=datetime.utcnow().isoformat(),
+        message="Localization successful"
+    )
+
+async def _read_limited_body(http_request: Request, limit: int) -> bytes:
+    """Read a request body, rejecting it with 413 once it exceeds limit bytes"""
+    content_length = http_request.headers.get("content-length")
+    if content_length is not None:
+        try:
+            declared_size = int(content_length)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid Content-Length header")
+        if declared_size > limit:
+            raise HTTPException(status_code=413, detail=f"Request body exceeds {limit} bytes")
+    
+    # Content-Length may be absent (chunked) or wrong, so count what arrives
+    body = bytearray()
+    async for chunk in http_request.stream():
+        body += chunk
+        if len(body) > limit:
+            raise HTTPException(status_code=413, detail=f"Request body exceeds {limit} bytes")
+    return bytes(body)
+
 @router.post("/localize/upload", response_model=LocalizationResponse)
 async def localize_upload(
     image: UploadFile = File(..., description="Image file for localization"),
@@ -173,59 +288,53 @@ async def localize_upload(
     Alternative endpoint for direct file upload
     """
     try:
-        import json
-        
         # Validate file type
         if not image.content_type.startswith('image/'):
             raise HTTPException(status_code=400, detail="File must be an image")
         
         # Read and process image
         image_data = await image.read()
-        image_pil = Image.open(BytesIO(image_data))
-        image_np = np.array(image_pil.convert('RGB'))
-        
-        # Parse camera intrinsics
-        try:
-            intrinsics_data = json.loads(camera_intrinsics)
-            camera_intrinsics_np = np.array(intrinsics_data, dtype=np.float32)
-        except Exception as e:
-            raise HTTPException(status_code=400, detail=f"Invalid camera intrinsics: {e}")
-        
-        # Prepare approximate location
-        approximate_location = None
-        if approximate_latitude is not None and approximate_longitude is not None:
-            approximate_location = (approximate_latitude, approximate_longitude)
-        
-        # Perform localization
-        result = await engine.localize(
-            image=image_np,
-            camera_intrinsics=camera_intrinsics_np,
-            approximate_location=approximate_location,
-            map_id=map_id
+        return await _localize_payload(
+            engine, image_data, camera_intrinsics,
+            approximate_latitude, approximate_longitude, map_id
         )
         
-        # Convert pose to readable format
-        from core.pose_estimator import PoseEstimator
-        pose_estimator = PoseEstimator()
-        pose_components = pose_estimator.matrix_to_pose_components(result.pose)
-        
-        return LocalizationResponse(
-            success=True,
-            pose=pose_components,
-            confidence=result.confidence,
-            error_estimate=result.error_estimate,
-            processing_time=result.processing_time,
-            map_id=result.map_id,
-            feature_matches=result.feature_matches,
-            quality_score=result.quality_score,
-            timestamp=datetime.utcnow().isoformat(),
-            message="Localization successful"
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Upload localization error: {e}")
+        raise HTTPException(status_code=500, detail=f"Localization failed: {e}")
+
+@router.post("/localize/raw", response_model=LocalizationResponse)
+async def localize_raw(
+    http_request: Request,
+    width: int = Query(..., gt=0, description="Frame width in pixels"),
+    height: int = Query(..., gt=0, description="Frame height in pixels"),
+    camera_intrinsics: str = Query(..., description="JSON string of 3x3 camera intrinsic matrix"),
+    image_format: Literal["raw_rgb8", "raw_bgr8"] = Query("raw_bgr8"),
+    approximate_latitude: Optional[float] = Query(None),
+    approximate_longitude: Optional[float] = Query(None),
+    map_id: Optional[str] = Query(None),
+    engine: VPSEngine = Depends(get_vps_engine),
+    api_key: str = Depends(verify_api_key)
+):
+    """
+    Perform visual localization on an uncompressed frame
+    Body is application/octet-stream holding packed 8-bit pixels
+    """
+    try:
+        # Wrap raw pixel buffer directly, no base64 or image decoder involved
+        image_data = await _read_limited_body(http_request, settings.MAX_UPLOAD_SIZE)
+        return await _localize_payload(
+            engine, image_data, camera_intrinsics,
+            approximate_latitude, approximate_longitude, map_id,
+            image_format=image_format, width=width, height=height
         )
         
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Upload localization error: {e}")
+        logger.error(f"Raw localization error: {e}")
         raise HTTPException(status_code=500, detail=f"Localization failed: {e}")
 
 @router.get("/status", response_model=StatusResponse)
@@ -275,7 +384,7 @@ async def upload_map(
     background_tasks: BackgroundTasks,
     request: MapUploadRequest,
     point_cloud: UploadFile = File(..., description="Point cloud file (.ply or .pcd)"),
-    images: List[UploadFile] = File(..., description="Reference images"),
+    images: List[UploadFile] = File(..., description="Reference images or videos"),
     engine: VPSEngine = Depends(get_vps_engine),
     api_key: str = Depends(verify_api_key)
 ):
@@ -289,8 +398,8 @@ async def upload_map(
             raise HTTPException(status_code=400, detail="Point cloud must be .ply, .pcd, or .pts file")
         
         for image_file in images:
-            if not image_file.content_type.startswith('image/'):
-                raise HTTPException(status_code=400, detail="All reference files must be images")
+            if not image_file.content_type.startswith(('image/', 'video/')):
+                raise HTTPException(status_code=400, detail="All reference files must be images or videos")
         
         # Generate map ID
         map_id = f"map_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}"
@@ -330,14 +439,23 @@ async def _process_map_upload(
     try:
         logger.info(f"Processing map upload: {map_id}")
         
-        # Store point cloud
-        point_cloud_data = await point_cloud.read()
-        await engine.storage_service.store_point_cloud(map_id, point_cloud_data)
+        # Stream point cloud from the upload's spool file to storage
+        await point_cloud.seek(0)
+        await engine.storage_service.store_point_cloud_file(map_id, point_cloud.file, point_cloud.size)
         
-        # Store reference images
-        for i, image_file in enumerate(images):
-            image_data = await image_file.read()
-            await engine.storage_service.store_reference_image(map_id, f"ref_{i}", image_data)
+        # Store reference images; videos contribute their keyframes
+        ref_index = 0
+        for image_file in images:
+            if image_file.content_type.startswith('video/'):
+                # Store each keyframe as it is decoded rather than holding them all
+                async with aclosing(_iter_video_keyframes(image_file, request.keyframe_stride)) as keyframes:
+                    async for image_data in keyframes:
+                        await engine.storage_service.store_reference_image(map_id, f"ref_{ref_index}", image_data)
+                        ref_index += 1
+            else:
+                image_data = await image_file.read()
+                await engine.storage_service.store_reference_image(map_id, f"ref_{ref_index}", image_data)
+                ref_index += 1
         
         # Process map (extract features, build index)
         await engine.map_matcher.process_new_map(map_id, request)
@@ -347,6 +465,49 @@ async def _process_map_upload(
     except Exception as e:
         logger.error(f"Map processing failed for {map_id}: {e}")
 
+async def _iter_video_keyframes(video: UploadFile, stride: int) -> AsyncIterator[bytes]:
+    """Spool an uploaded video to disk and yield every stride-th frame as JPEG"""
+    loop = asyncio.get_running_loop()
+    suffix = Path(video.filename or "").suffix
+    
+    with tempfile.NamedTemporaryFile(suffix=suffix) as tmp:
+        await video.seek(0)
+        await loop.run_in_executor(None, shutil.copyfileobj, video.file, tmp)
+        tmp.flush()
+        
+        capture = await loop.run_in_executor(None, cv2.VideoCapture, tmp.name)
+        frame_index = 0
+        keyframe_count = 0
+        try:
+            while True:
+                keyframe, frame_index = await loop.run_in_executor(
+                    None, _next_keyframe, capture, stride, frame_index
+                )
+                if keyframe is None:
+                    break
+                keyframe_count += 1
+                yield keyframe
+        finally:
+            capture.release()
+        
+        logger.info(f"Extracted {keyframe_count} keyframes from {frame_index} video frames")
+
+def _next_keyframe(capture: cv2.VideoCapture, stride: int, frame_index: int) -> Tuple[Optional[bytes], int]:
+    """
+    Advance to the next stride-th frame and return it as JPEG with the new frame index
+    Skipped frames are still demuxed and decoded by grab(); only retrieve()'s
+    conversion and copy into a new array is avoided for them
+    """
+    while capture.grab():
+        frame_index += 1
+        if (frame_index - 1) % stride == 0:
+            ok, frame = capture.retrieve()
+            if ok:
+                ok, encoded = cv2.imencode('.jpg', frame)
+                if ok:
+                    return encoded.tobytes(), frame_index
+    return None, frame_index
+
 @router.get("/maps/{map_id}")
 async def get_map_info(
     map_id: str,
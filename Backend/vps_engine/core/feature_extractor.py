@@ -6,23 +6,41 @@ Optimized for AR applications with robust feature detection
 import logging
 import numpy as np
 import cv2
-from typing import Dict, List, Tuple, Optional, Any
+from typing import Dict, List, Tuple, Optional, Any, Literal
 from dataclasses import dataclass
 import asyncio
 from concurrent.futures import ThreadPoolExecutor
 import time
+import os
+import threading
 
 logger = logging.getLogger(__name__)
 
+# Column layout of FeatureSet.keypoints_np
+KEYPOINT_FIELDS = ('x', 'y', 'size', 'angle', 'response', 'octave')
+
+# Detectors producing binary descriptors (Hamming distance); others are
+# compared with L2, including SIFT's quantized uint8 RootSIFT descriptors
+BINARY_DETECTORS = ('ORB', 'AKAZE')
+
 @dataclass
 class FeatureSet:
     """Container for extracted features"""
-    keypoints: List[cv2.KeyPoint]
+    keypoints_np: np.ndarray  # (N, 6) float32, columns per KEYPOINT_FIELDS
     descriptors: np.ndarray
     image_shape: Tuple[int, int]
     detector_type: str
     extraction_time: float
     feature_count: int
+    scale: float = 1.0  # Detection resolution / input resolution; keypoints are in input pixels
+
+@dataclass(slots=True)
+class ExtractionStats:
+    """Running extraction counters; averages are derived on read"""
+    total_extractions: int = 0
+    failed_extractions: int = 0
+    sum_features: int = 0
+    sum_time: float = 0.0
 
 class FeatureExtractor:
     """
@@ -30,22 +48,30 @@ class FeatureExtractor:
     Supports multiple detectors optimized for different scenarios
     """
     
-    def __init__(self, detector_type: str = "ORB", max_features: int = 5000):
+    def __init__(self, detector_type: str = "ORB", max_features: int = 5000, max_workers: int = 2,
+                 detector_backend: Literal["cpu", "cuda"] = "cpu", max_long_edge: Optional[int] = 1280):
         self.detector_type = detector_type.upper()
         self.max_features = max_features
+        self.max_long_edge = max_long_edge
         self.detector = None
-        self.executor = ThreadPoolExecutor(max_workers=2)
+        self.detector_backend = detector_backend.lower()
+        self._cuda_local = None
+        
+        # Per-thread preprocessing buffers, reused across same-sized frames
+        self._scratch = threading.local()
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+        
+        # Share cores between concurrent extractions instead of letting each
+        # worker's OpenCV parallel regions claim every core
+        cv2.setNumThreads(max(1, (os.cpu_count() or 1) // max_workers))
         
         # Initialize detector
         self._initialize_detector()
+        if self.detector_backend == "cuda":
+            self._initialize_cuda_backend()
         
         # Performance tracking
-        self.stats = {
-            'total_extractions': 0,
-            'average_features': 0.0,
-            'average_time': 0.0,
-            'failed_extractions': 0
-        }
+        self.stats = ExtractionStats()
 
     def _initialize_detector(self):
         """Initialize the feature detector based on type"""
@@ -95,6 +121,9 @@ class FeatureExtractor:
                 self._initialize_detector()
                 return
                 
+            # Parameters are fixed per detector; build the reported dict once
+            self._detector_params = self._build_detector_parameters()
+            
             logger.info(f"✅ Initialized {self.detector_type} feature detector")
             
         except Exception as e:
@@ -107,121 +136,252 @@ class FeatureExtractor:
             else:
                 raise
 
+    def _initialize_cuda_backend(self):
+        """Enable GPU feature extraction, falling back to CPU when unavailable"""
+        try:
+            if self.detector_type != "ORB":
+                raise RuntimeError(f"CUDA backend supports ORB only, not {self.detector_type}")
+            if cv2.cuda.getCudaEnabledDeviceCount() == 0:
+                raise RuntimeError("no CUDA device available")
+            
+            # Fail early if this OpenCV build lacks cudafeatures2d
+            self._create_cuda_detector()
+            
+            # Detector, upload buffer and stream are per worker thread
+            self._cuda_local = threading.local()
+            logger.info("✅ Using CUDA backend for ORB feature extraction")
+            
+        except Exception as e:
+            logger.warning(f"CUDA feature extraction unavailable ({e}), using CPU")
+            self.detector_backend = "cpu"
+
+    def _create_cuda_detector(self):
+        """Create a CUDA ORB detector with the same parameters as the CPU one"""
+        return cv2.cuda.ORB_create(
+            nfeatures=self.max_features,
+            scaleFactor=1.2,
+            nlevels=8,
+            edgeThreshold=31,
+            firstLevel=0,
+            WTA_K=2,
+            scoreType=cv2.ORB_HARRIS_SCORE,
+            patchSize=31,
+            fastThreshold=20
+        )
+
+    def _detect_and_compute_cuda(self, image: np.ndarray) -> Tuple[List[cv2.KeyPoint], Optional[np.ndarray]]:
+        """Run detection on the GPU using this thread's detector and stream"""
+        local = self._cuda_local
+        if not hasattr(local, 'detector'):
+            local.detector = self._create_cuda_detector()
+            local.stream = cv2.cuda_Stream()
+            local.gpu_image = cv2.cuda_GpuMat()
+        
+        local.gpu_image.upload(image, local.stream)
+        gpu_keypoints, gpu_descriptors = local.detector.detectAndComputeAsync(
+            local.gpu_image, None, stream=local.stream
+        )
+        local.stream.waitForCompletion()
+        
+        if gpu_descriptors.empty():
+            return [], None
+        return local.detector.convert(gpu_keypoints), gpu_descriptors.download()
+
     async def extract_features(self, image: np.ndarray, 
                              preprocess: bool = True) -> FeatureSet:
         """
         Extract features from input image
         
         Args:
-            image: Input image (RGB or grayscale)
+            image: Input image (BGR or grayscale)
             preprocess: Apply preprocessing for better feature detection
             
         Returns:
             FeatureSet containing keypoints and descriptors
         """
         start_time = time.time()
-        self.stats['total_extractions'] += 1
+        self.stats.total_extractions += 1
         
         try:
-            # Preprocess image
-            processed_image = await self._preprocess_image(image, preprocess)
-            
-            # Extract features in thread pool to avoid blocking
-            loop = asyncio.get_event_loop()
-            keypoints, descriptors = await loop.run_in_executor(
-                self.executor, self._extract_features_sync, processed_image
+            # Preprocess and extract in one thread pool job to avoid blocking
+            loop = asyncio.get_running_loop()
+            keypoints_np, descriptors, image_shape, scale = await loop.run_in_executor(
+                self.executor, self._preprocess_and_extract_sync, image, preprocess
             )
             
             extraction_time = time.time() - start_time
             
-            # Create feature set
-            feature_set = FeatureSet(
-                keypoints=keypoints,
-                descriptors=descriptors,
-                image_shape=processed_image.shape[:2],
-                detector_type=self.detector_type,
-                extraction_time=extraction_time,
-                feature_count=len(keypoints)
-            )
-            
-            # Update statistics
-            self._update_stats(len(keypoints), extraction_time)
-            
-            logger.debug(f"Extracted {len(keypoints)} features in {extraction_time:.3f}s")
-            
-            return feature_set
+            return self._create_feature_set(keypoints_np, descriptors, image_shape, scale, extraction_time)
             
         except Exception as e:
-            self.stats['failed_extractions'] += 1
+            self.stats.failed_extractions += 1
             logger.error(f"Feature extraction failed: {e}")
             raise
 
-    def _extract_features_sync(self, image: np.ndarray) -> Tuple[List[cv2.KeyPoint], np.ndarray]:
+    def _create_feature_set(self, keypoints_np: np.ndarray, descriptors: np.ndarray,
+                            image_shape: Tuple[int, int], scale: float,
+                            extraction_time: float) -> FeatureSet:
+        """Wrap extraction output in a FeatureSet and record statistics"""
+        feature_set = FeatureSet(
+            keypoints_np=keypoints_np,
+            descriptors=descriptors,
+            image_shape=image_shape,
+            detector_type=self.detector_type,
+            extraction_time=extraction_time,
+            feature_count=len(keypoints_np),
+            scale=scale
+        )
+        
+        # Update statistics
+        self._update_stats(len(keypoints_np), extraction_time)
+        
+        logger.debug(f"Extracted {len(keypoints_np)} features in {extraction_time:.3f}s")
+        
+        return feature_set
+
+    def _preprocess_and_extract_sync(self, image: np.ndarray, preprocess: bool
+                                     ) -> Tuple[np.ndarray, np.ndarray, Tuple[int, int], float]:
+        """Preprocess and extract features (runs in thread pool)"""
+        processed_image, scale = self._preprocess_image(image, preprocess)
+        keypoints_np, descriptors = self._extract_features_sync(processed_image)
+        
+        # Map keypoint position and size back to input image pixels
+        if scale != 1.0:
+            keypoints_np[:, :3] /= scale
+        
+        return keypoints_np, descriptors, image.shape[:2], scale
+
+    def _extract_features_sync(self, image: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
         """Synchronous feature extraction (runs in thread pool)"""
         
         # Detect keypoints and compute descriptors
-        keypoints, descriptors = self.detector.detectAndCompute(image, None)
+        if self._cuda_local is not None:
+            keypoints, descriptors = self._detect_and_compute_cuda(image)
+        else:
+            keypoints, descriptors = self.detector.detectAndCompute(image, None)
         
         if descriptors is None:
-            descriptors = np.array([])
-            keypoints = []
+            return np.empty((0, len(KEYPOINT_FIELDS)), dtype=np.float32), np.array([])
         
-        return keypoints, descriptors
+        if self.detector_type == "SIFT":
+            descriptors = self._quantize_root_sift(descriptors)
+        
+        # Flatten keypoints into one array so no KeyPoint objects outlive extraction
+        keypoints_np = np.array(
+            [(*kp.pt, kp.size, kp.angle, kp.response, kp.octave) for kp in keypoints],
+            dtype=np.float32
+        ).reshape(-1, len(KEYPOINT_FIELDS))
+        
+        return keypoints_np, descriptors
+
+    @staticmethod
+    def _quantize_root_sift(descriptors: np.ndarray) -> np.ndarray:
+        """Convert SIFT descriptors to RootSIFT quantized to uint8 (128 B instead of 512 B)"""
+        l1_norm = descriptors.sum(axis=1, keepdims=True)
+        root_sift = np.sqrt(descriptors / np.maximum(l1_norm, 1e-7))
+        return np.clip(root_sift * 512, 0, 255).astype(np.uint8)
+
+    @staticmethod
+    def keypoints_from_array(keypoints_np: np.ndarray) -> List[cv2.KeyPoint]:
+        """Rebuild cv2.KeyPoint objects from a keypoint array (for drawing/debugging)"""
+        return [
+            cv2.KeyPoint(float(x), float(y), float(size), float(angle), float(response), int(octave))
+            for x, y, size, angle, response, octave in keypoints_np
+        ]
 
-    async def _preprocess_image(self, image: np.ndarray, apply_preprocessing: bool) -> np.ndarray:
-        """Preprocess image for optimal feature detection"""
+    def _scratch_buffers(self, shape: Tuple[int, int]) -> Dict[str, np.ndarray]:
+        """Get this thread's preprocessing buffers for a frame shape"""
+        cache = getattr(self._scratch, 'buffers', None)
+        if cache is None:
+            cache = self._scratch.buffers = {}
         
-        # Convert to grayscale if needed
+        buffers = cache.get(shape)
+        if buffers is None:
+            # Bound memory if clients keep changing resolution
+            if len(cache) >= 4:
+                cache.clear()
+            buffers = cache[shape] = {
+                'gray': np.empty(shape, dtype=np.uint8),
+                'eq': np.empty(shape, dtype=np.uint8)
+            }
+        return buffers
+
+    def _preprocess_image(self, image: np.ndarray, apply_preprocessing: bool) -> Tuple[np.ndarray, float]:
+        """
+        Preprocess image for optimal feature detection
+        
+        Returns the detector input and the scale applied to the image. The
+        detector input may be a per-thread scratch buffer, only valid until
+        the next call on the same thread.
+        """
+        
+        # Convert to grayscale if needed (detectAndCompute does not mutate its input)
         if len(image.shape) == 3:
-            gray = cv2.cvtColor(image, cv2.COLOR_RGB2GRAY)
+            gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY,
+                                dst=self._scratch_buffers(image.shape[:2])['gray'])
         else:
-            gray = image.copy()
+            gray = image
         
-        if not apply_preprocessing:
-            return gray
+        # Clamp resolution; detection cost grows with pixel count
+        scale = 1.0
+        height, width = gray.shape[:2]
+        if self.max_long_edge and max(height, width) > self.max_long_edge:
+            scale = self.max_long_edge / max(height, width)
+            size = (int(round(width * scale)), int(round(height * scale)))
+            gray = cv2.resize(gray, size, dst=self._scratch_buffers((size[1], size[0]))['gray'],
+                              interpolation=cv2.INTER_AREA)
         
-        # Apply preprocessing pipeline
-        processed = gray
-        
-        # Histogram equalization for better contrast
-        processed = cv2.equalizeHist(processed)
+        if not apply_preprocessing:
+            return gray, scale
         
-        # Gaussian blur to reduce noise
-        processed = cv2.GaussianBlur(processed, (3, 3), 0)
+        # Histogram equalization for better contrast, then Gaussian blur to
+        # reduce noise, ping-ponging between the two scratch buffers
+        buffers = self._scratch_buffers(gray.shape[:2])
+        cv2.equalizeHist(gray, dst=buffers['eq'])
+        cv2.GaussianBlur(buffers['eq'], (3, 3), 0, dst=buffers['gray'])
         
-        return processed
+        return buffers['gray'], scale
 
     def _update_stats(self, feature_count: int, extraction_time: float):
-        """Update extraction statistics"""
-        total_extractions = self.stats['total_extractions']
-        
-        # Update average feature count
-        current_avg_features = self.stats['average_features']
-        self.stats['average_features'] = \
-            (current_avg_features * (total_extractions - 1) + feature_count) / total_extractions
-        
-        # Update average extraction time
-        current_avg_time = self.stats['average_time']
-        self.stats['average_time'] = \
-            (current_avg_time * (total_extractions - 1) + extraction_time) / total_extractions
+        """Update extraction statistics (averages are derived on read)"""
+        self.stats.sum_features += feature_count
+        self.stats.sum_time += extraction_time
 
-    async def extract_features_batch(self, images: List[np.ndarray]) -> List[FeatureSet]:
-        """Extract features from multiple images concurrently"""
+    async def extract_features_batch(self, images: List[np.ndarray],
+                                     return_exceptions: bool = False) -> List[Any]:
+        """
+        Extract features from multiple images concurrently
+        
+        With return_exceptions, results stay aligned with images and failed
+        extractions are returned as the raised exception instead of dropped.
+        """
+        
+        if not images:
+            return []
+        
+        start_time = time.time()
+        self.stats.total_extractions += len(images)
         
-        tasks = []
-        for image in images:
-            task = asyncio.create_task(self.extract_features(image))
-            tasks.append(task)
+        # Submit every job to the pool directly; no per-image task wrappers
+        loop = asyncio.get_running_loop()
+        futures = [
+            loop.run_in_executor(self.executor, self._preprocess_and_extract_sync, image, True)
+            for image in images
+        ]
+        results = await asyncio.gather(*futures, return_exceptions=True)
         
-        results = await asyncio.gather(*tasks, return_exceptions=True)
+        # Images share the pool, so report amortized per-image time
+        extraction_time = (time.time() - start_time) / len(images)
         
-        # Filter out exceptions
         feature_sets = []
         for i, result in enumerate(results):
             if isinstance(result, Exception):
+                self.stats.failed_extractions += 1
                 logger.error(f"Feature extraction failed for image {i}: {result}")
+                if return_exceptions:
+                    feature_sets.append(result)
             else:
-                feature_sets.append(result)
+                feature_sets.append(self._create_feature_set(*result, extraction_time))
         
         return feature_sets
 
@@ -229,12 +389,17 @@ class FeatureExtractor:
         """Get information about the current detector"""
         return {
             'detector_type': self.detector_type,
+            'detector_backend': self.detector_backend,
             'max_features': self.max_features,
             'parameters': self._get_detector_parameters()
         }
 
     def _get_detector_parameters(self) -> Dict[str, Any]:
         """Get detector-specific parameters"""
+        return self._detector_params
+
+    def _build_detector_parameters(self) -> Dict[str, Any]:
+        """Build detector-specific parameters"""
         if self.detector_type == "ORB":
             return {
                 'nfeatures': self.max_features,
@@ -261,39 +426,57 @@ class FeatureExtractor:
         else:
             return {}
 
-    def visualize_features(self, image: np.ndarray, feature_set: FeatureSet) -> np.ndarray:
-        """Visualize detected features on image"""
+    def visualize_features(self, image: np.ndarray, feature_set: FeatureSet,
+                           dst: Optional[np.ndarray] = None, rich: bool = False) -> np.ndarray:
+        """
+        Visualize detected features on image
         
-        # Convert to BGR for visualization
+        Draws into dst when given (BGR, same size as image) so repeated calls
+        can reuse one buffer. Rich mode adds keypoint size and orientation.
+        """
+        
+        # Input is already BGR; only grayscale needs expanding
         if len(image.shape) == 3:
-            vis_image = cv2.cvtColor(image, cv2.COLOR_RGB2BGR)
+            if dst is None:
+                dst = image.copy()
+            else:
+                np.copyto(dst, image)
         else:
-            vis_image = cv2.cvtColor(image, cv2.COLOR_GRAY2BGR)
+            dst = cv2.cvtColor(image, cv2.COLOR_GRAY2BGR, dst=dst)
         
-        # Draw keypoints
-        vis_image = cv2.drawKeypoints(
-            vis_image, 
-            feature_set.keypoints,
-            None,
+        # Draw keypoints directly over the output buffer
+        flags = cv2.DRAW_MATCHES_FLAGS_DRAW_OVER_OUTIMG
+        if rich:
+            flags |= cv2.DRAW_MATCHES_FLAGS_DRAW_RICH_KEYPOINTS
+        cv2.drawKeypoints(
+            dst, 
+            self.keypoints_from_array(feature_set.keypoints_np),
+            dst,
             color=(0, 255, 0),
-            flags=cv2.DRAW_MATCHES_FLAGS_DRAW_RICH_KEYPOINTS
+            flags=flags
         )
         
         # Add text information
         text = f"{feature_set.detector_type}: {feature_set.feature_count} features"
-        cv2.putText(vis_image, text, (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
+        cv2.putText(dst, text, (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
         
-        return vis_image
+        return dst
 
     def get_statistics(self) -> Dict[str, Any]:
         """Get feature extraction statistics"""
+        total_extractions = self.stats.total_extractions
+        failed_extractions = self.stats.failed_extractions
+        successful = total_extractions - failed_extractions
+        
         success_rate = 0.0
-        if self.stats['total_extractions'] > 0:
-            success_rate = (self.stats['total_extractions'] - self.stats['failed_extractions']) / \
-                          self.stats['total_extractions']
+        if total_extractions > 0:
+            success_rate = successful / total_extractions
         
         return {
-            **self.stats,
+            'total_extractions': total_extractions,
+            'average_features': self.stats.sum_features / successful if successful > 0 else 0.0,
+            'average_time': self.stats.sum_time / successful if successful > 0 else 0.0,
+            'failed_extractions': failed_extractions,
             'success_rate': success_rate,
             'detector_info': self.get_detector_info()
         }
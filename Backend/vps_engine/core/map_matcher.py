@@ -4,14 +4,36 @@ Efficient spatial indexing and feature matching
 """
 
 import logging
+import cv2
 import numpy as np
 from typing import Dict, List, Tuple, Optional, Any
 import asyncio
 from dataclasses import dataclass
 import time
+import hashlib
+import struct
+import threading
+from collections import OrderedDict
+
+from .feature_extractor import BINARY_DETECTORS
+
+try:
+    import simsimd
+    SIMSIMD_AVAILABLE = True
+except ImportError:
+    SIMSIMD_AVAILABLE = False
+
+try:
+    import faiss
+    FAISS_AVAILABLE = True
+except ImportError:
+    FAISS_AVAILABLE = False
 
 logger = logging.getLogger(__name__)
 
+# Upper bound on distance matrix entries computed at once (float32)
+MATCH_BLOCK_ENTRIES = 1 << 22
+
 @dataclass
 class MapData:
     """3D map data container"""
@@ -40,15 +62,30 @@ class MapMatcher:
             'feature_match_threshold': 0.7,
             'spatial_search_radius': 1000.0,  # meters
             'min_map_quality': 0.5,
-            'cache_ttl': 3600  # 1 hour
+            'cache_ttl': 3600,  # 1 hour
+            'ann_min_map_features': 5000,  # Use HNSW index at or above this map size
+            'ann_hnsw_neighbors': 32,
+            'ann_ef_search': 64,
+            'max_cached_indexes': 16
         }
         
+        # Per-map HNSW indexes (map_id -> (feature_count, index)), LRU ordered
+        self._map_indexes: "OrderedDict[str, Tuple[int, Any]]" = OrderedDict()
+        # Guards the map caches, which are shared by matching worker threads
+        self._cache_lock = threading.Lock()
+        
+        # Brute-force Hamming matcher, reused when SimSIMD is unavailable
+        self._bf_hamming = cv2.BFMatcher(cv2.NORM_HAMMING, crossCheck=False)
+        
+        # Per-map float32 descriptors and squared norms for brute-force L2 matching
+        self._map_norms: "OrderedDict[str, Tuple[int, np.ndarray, np.ndarray]]" = OrderedDict()
+        
         # Performance tracking
         self.stats = {
             'total_matches': 0,
             'cache_hits': 0,
             'successful_matches': 0,
-            'average_match_time': 0.0
+            'total_match_time': 0.0
         }
 
     async def find_candidate_maps(self, features, approximate_location: Optional[Tuple[float, float]] = None,
@@ -69,7 +106,7 @@ class MapMatcher:
             self.stats['total_matches'] += 1
             
             # Check cache first
-            cache_key = f"candidates_{hash(str(approximate_location))}_{map_id}"
+            cache_key = self._candidate_cache_key(approximate_location, map_id)
             cached_candidates = await self.cache_service.get(cache_key)
             
             if cached_candidates:
@@ -111,6 +148,18 @@ class MapMatcher:
             logger.error(f"Failed to find candidate maps: {e}")
             return []
 
+    def _candidate_cache_key(self, approximate_location: Optional[Tuple[float, float]],
+                             map_id: Optional[str]) -> str:
+        """Build a process-independent cache key for candidate map lookups"""
+        
+        # Round to ~1m so nearby requests share an entry, then hash the packed floats
+        location_key = "none"
+        if approximate_location:
+            lat, lng = (round(coord, 5) for coord in approximate_location)
+            location_key = hashlib.blake2b(struct.pack('<dd', lat, lng), digest_size=8).hexdigest()
+        
+        return f"candidates_{location_key}_{map_id or ''}"
+
     async def _find_maps_by_location(self, location: Tuple[float, float]) -> List[Dict]:
         """Find maps within spatial search radius"""
         
@@ -121,33 +170,28 @@ class MapMatcher:
         maps = await self.db_service.find_maps_by_location(lat, lng, radius)
         
         # Sort by distance (if location data available)
-        maps_with_distance = []
-        for map_data in maps:
-            if map_data.get('location'):
-                map_lat, map_lng = map_data['location']
-                distance = self._calculate_distance(lat, lng, map_lat, map_lng)
-                maps_with_distance.append((distance, map_data))
-            else:
-                maps_with_distance.append((float('inf'), map_data))
+        distances = np.full(len(maps), np.inf)
+        located = [i for i, map_data in enumerate(maps) if map_data.get('location')]
+        if located:
+            locations = np.array([maps[i]['location'] for i in located], dtype=np.float64)
+            distances[located] = self._calculate_distances(lat, lng, locations)
         
-        # Sort by distance and return map data
-        maps_with_distance.sort(key=lambda x: x[0])
-        return [map_data for _, map_data in maps_with_distance]
+        # Stable sort keeps database order for ties and unlocated maps
+        order = np.argsort(distances, kind='stable')
+        return [maps[i] for i in order]
 
-    def _calculate_distance(self, lat1: float, lng1: float, lat2: float, lng2: float) -> float:
-        """Calculate distance between two GPS coordinates in meters"""
-        
-        # Haversine formula
-        from math import radians, cos, sin, asin, sqrt
+    def _calculate_distances(self, lat: float, lng: float, locations: np.ndarray) -> np.ndarray:
+        """Calculate distances in meters from a GPS coordinate to an (N, 2) array of (lat, lng)"""
         
         # Convert to radians
-        lat1, lng1, lat2, lng2 = map(radians, [lat1, lng1, lat2, lng2])
+        lat1, lng1 = np.radians(lat), np.radians(lng)
+        lat2, lng2 = np.radians(locations[:, 0]), np.radians(locations[:, 1])
         
         # Haversine formula
         dlat = lat2 - lat1
         dlng = lng2 - lng1
-        a = sin(dlat/2)**2 + cos(lat1) * cos(lat2) * sin(dlng/2)**2
-        c = 2 * asin(sqrt(a))
+        a = np.sin(dlat / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin(dlng / 2) ** 2
+        c = 2 * np.arcsin(np.sqrt(a))
         
         # Earth radius in meters
         r = 6371000
@@ -172,41 +216,46 @@ class MapMatcher:
             map_features = map_data.get('features', np.array([]))
             map_points_3d = map_data.get('feature_points', np.array([]))
             
-            if len(map_features) == 0 or len(query_features.descriptors) == 0:
+            if len(map_features) == 0 or len(map_points_3d) == 0 or len(query_features.descriptors) == 0:
                 return []
             
             # Perform feature matching
             matches = await self._match_descriptors(
                 query_features.descriptors, 
-                map_features
+                map_features,
+                binary=query_features.detector_type in BINARY_DETECTORS,
+                map_id=map_data.get('id')
             )
             
-            # Convert to 2D-3D correspondences
-            correspondences = []
-            for match in matches:
-                query_idx, map_idx, distance = match
-                
-                # Get 2D image point
-                kp = query_features.keypoints[query_idx]
-                image_x, image_y = kp.pt
-                
-                # Get 3D world point
-                if map_idx < len(map_points_3d):
-                    world_point = map_points_3d[map_idx]
-                    
-                    correspondence = {
-                        'image_x': image_x,
-                        'image_y': image_y,
-                        'world_x': world_point[0],
-                        'world_y': world_point[1],
-                        'world_z': world_point[2],
-                        'distance': distance,
-                        'confidence': 1.0 - distance,  # Simple confidence
-                        'query_idx': query_idx,
-                        'map_idx': map_idx
-                    }
-                    
-                    correspondences.append(correspondence)
+            # Convert to 2D-3D correspondences; gather all coordinates with
+            # array indexing and build the dicts from plain Python columns
+            if not matches:
+                return []
+            
+            query_idx, map_idx, distance = (np.asarray(column) for column in zip(*matches))
+            in_map = map_idx < len(map_points_3d)
+            query_idx, map_idx, distance = query_idx[in_map], map_idx[in_map], distance[in_map]
+            
+            image_points = query_features.keypoints_np[query_idx, :2].tolist()
+            world_points = np.asarray(map_points_3d)[map_idx, :3].tolist()
+            distances = distance.tolist()
+            
+            correspondences = [
+                {
+                    'image_x': image_x,
+                    'image_y': image_y,
+                    'world_x': world_x,
+                    'world_y': world_y,
+                    'world_z': world_z,
+                    'distance': dist,
+                    'confidence': 1.0 - dist,  # Simple confidence
+                    'query_idx': q_idx,
+                    'map_idx': m_idx
+                }
+                for (image_x, image_y), (world_x, world_y, world_z), dist, q_idx, m_idx in zip(
+                    image_points, world_points, distances, query_idx.tolist(), map_idx.tolist()
+                )
+            ]
             
             match_time = time.time() - start_time
             logger.debug(f"Matched {len(correspondences)} features in {match_time:.3f}s")
@@ -221,21 +270,35 @@ class MapMatcher:
             return []
 
     async def _match_descriptors(self, query_descriptors: np.ndarray, 
-                                map_descriptors: np.ndarray) -> List[Tuple[int, int, float]]:
-        """Match descriptors using brute force or FLANN"""
+                                map_descriptors: np.ndarray,
+                                binary: bool = True,
+                                map_id: Optional[str] = None) -> List[Tuple[int, int, float]]:
+        """Match descriptors in a worker thread so the event loop keeps serving I/O"""
+        return await asyncio.to_thread(
+            self._match_descriptors_sync, query_descriptors, map_descriptors, binary, map_id
+        )
+
+    def _match_descriptors_sync(self, query_descriptors: np.ndarray,
+                                map_descriptors: np.ndarray,
+                                binary: bool,
+                                map_id: Optional[str]) -> List[Tuple[int, int, float]]:
+        """Match descriptors using an approximate index or brute force"""
         
-        import cv2
+        # Large maps are searched through a cached HNSW index
+        if FAISS_AVAILABLE and map_id and len(map_descriptors) >= self.config['ann_min_map_features']:
+            map_index = self._get_map_index(map_id, map_descriptors, binary)
+            return self._match_descriptors_ann(query_descriptors, map_index, binary)
         
-        # Use appropriate matcher based on descriptor type
-        if query_descriptors.dtype == np.uint8:
-            # Binary descriptors (ORB, AKAZE)
-            matcher = cv2.BFMatcher(cv2.NORM_HAMMING, crossCheck=False)
-        else:
-            # Float descriptors (SIFT, SURF)
-            matcher = cv2.BFMatcher(cv2.NORM_L2, crossCheck=False)
+        # Vector descriptors (SIFT, SURF); dtype alone is not enough since
+        # quantized SIFT descriptors are uint8 but not binary
+        if not binary:
+            return self._match_descriptors_gemm(query_descriptors, map_descriptors, map_id)
+        
+        if SIMSIMD_AVAILABLE:
+            return self._match_descriptors_simsimd(query_descriptors, map_descriptors)
         
-        # Perform matching with ratio test
-        raw_matches = matcher.knnMatch(query_descriptors, map_descriptors, k=2)
+        # Binary descriptors (ORB, AKAZE); perform matching with ratio test
+        raw_matches = self._bf_hamming.knnMatch(query_descriptors, map_descriptors, k=2)
         
         good_matches = []
         for match_pair in raw_matches:
@@ -247,6 +310,150 @@ class MapMatcher:
         
         return good_matches
 
+    def _match_descriptors_simsimd(self, query_descriptors: np.ndarray,
+                                   map_descriptors: np.ndarray) -> List[Tuple[int, int, float]]:
+        """Brute-force 2-NN matching of binary descriptors with SIMD Hamming kernels"""
+        
+        if len(map_descriptors) < 2:
+            return []
+        
+        # Bound distance matrix memory by matching query rows in blocks
+        block_rows = max(1, MATCH_BLOCK_ENTRIES // len(map_descriptors))
+        ratio = self.config['feature_match_threshold']
+        
+        good_matches = []
+        for start in range(0, len(query_descriptors), block_rows):
+            distances = np.asarray(simsimd.cdist(
+                query_descriptors[start:start + block_rows], map_descriptors,
+                metric='hamming', dtype='bin8', out_dtype='float32'
+            ))
+            passed, best_map, best_dist = self._ratio_test_top2(distances, ratio)
+            good_matches.extend(zip(
+                (passed + start).tolist(), best_map.tolist(), best_dist.tolist()
+            ))
+        
+        return good_matches
+
+    def _match_descriptors_gemm(self, query_descriptors: np.ndarray,
+                                map_descriptors: np.ndarray,
+                                map_id: Optional[str] = None) -> List[Tuple[int, int, float]]:
+        """Brute-force 2-NN L2 matching via ||q||^2 + ||m||^2 - 2*q.m and one GEMM per block"""
+        
+        if len(map_descriptors) < 2:
+            return []
+        
+        map_f32, map_norm_sq = self._get_map_norms(map_id, map_descriptors)
+        query_f32 = np.asarray(query_descriptors, dtype=np.float32)
+        query_norm_sq = np.einsum('ij,ij->i', query_f32, query_f32)
+        
+        # Bound distance matrix memory by matching query rows in blocks
+        block_rows = max(1, MATCH_BLOCK_ENTRIES // len(map_descriptors))
+        ratio = self.config['feature_match_threshold'] ** 2
+        
+        good_matches = []
+        for start in range(0, len(query_f32), block_rows):
+            block = slice(start, start + block_rows)
+            
+            # Squared distances; clamp the rounding noise below zero
+            distances = query_f32[block] @ map_f32.T
+            distances *= -2.0
+            distances += query_norm_sq[block, None]
+            distances += map_norm_sq[None, :]
+            np.maximum(distances, 0.0, out=distances)
+            
+            passed, best_map, best_dist = self._ratio_test_top2(distances, ratio)
+            good_matches.extend(zip(
+                (passed + start).tolist(), best_map.tolist(), np.sqrt(best_dist).tolist()
+            ))
+        
+        return good_matches
+
+    @staticmethod
+    def _ratio_test_top2(distances: np.ndarray,
+                         ratio: float) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Lowe's ratio test on the two nearest map descriptors of each query row"""
+        
+        nearest = np.argpartition(distances, 1, axis=1)[:, :2]
+        nearest_dist = np.take_along_axis(distances, nearest, axis=1)
+        order = np.argsort(nearest_dist, axis=1)
+        nearest = np.take_along_axis(nearest, order, axis=1)
+        nearest_dist = np.take_along_axis(nearest_dist, order, axis=1)
+        
+        passed = np.flatnonzero(nearest_dist[:, 0] < ratio * nearest_dist[:, 1])
+        return passed, nearest[passed, 0], nearest_dist[passed, 0]
+
+    def _get_map_norms(self, map_id: Optional[str],
+                       map_descriptors: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Get or compute a map's float32 descriptors and squared L2 norms"""
+        
+        with self._cache_lock:
+            cached = self._map_norms.get(map_id) if map_id else None
+            if cached is not None and cached[0] == len(map_descriptors):
+                self._map_norms.move_to_end(map_id)
+                return cached[1], cached[2]
+        
+        map_f32 = np.ascontiguousarray(map_descriptors, dtype=np.float32)
+        map_norm_sq = np.einsum('ij,ij->i', map_f32, map_f32)
+        
+        if map_id:
+            with self._cache_lock:
+                self._map_norms[map_id] = (len(map_descriptors), map_f32, map_norm_sq)
+                if len(self._map_norms) > self.config['max_cached_indexes']:
+                    self._map_norms.popitem(last=False)
+        
+        return map_f32, map_norm_sq
+
+    def _get_map_index(self, map_id: str, map_descriptors: np.ndarray, binary: bool):
+        """Get or build the cached HNSW index over a map's descriptors"""
+        
+        with self._cache_lock:
+            cached = self._map_indexes.get(map_id)
+            if cached is not None and cached[0] == len(map_descriptors):
+                self._map_indexes.move_to_end(map_id)
+                return cached[1]
+        
+        neighbors = self.config['ann_hnsw_neighbors']
+        if binary:
+            map_index = faiss.IndexBinaryHNSW(map_descriptors.shape[1] * 8, neighbors)
+            map_index.add(np.ascontiguousarray(map_descriptors, dtype=np.uint8))
+        else:
+            map_index = faiss.IndexHNSWFlat(map_descriptors.shape[1], neighbors)
+            map_index.add(np.ascontiguousarray(map_descriptors, dtype=np.float32))
+        map_index.hnsw.efSearch = self.config['ann_ef_search']
+        
+        with self._cache_lock:
+            self._map_indexes[map_id] = (len(map_descriptors), map_index)
+            if len(self._map_indexes) > self.config['max_cached_indexes']:
+                self._map_indexes.popitem(last=False)
+        
+        logger.info(f"Built HNSW index for map {map_id} ({len(map_descriptors)} descriptors)")
+        return map_index
+
+    def _match_descriptors_ann(self, query_descriptors: np.ndarray, map_index,
+                               binary: bool) -> List[Tuple[int, int, float]]:
+        """2-NN search in a map's HNSW index with Lowe's ratio test"""
+        
+        # Binary index returns Hamming distances, float index squared L2
+        if binary:
+            query = np.ascontiguousarray(query_descriptors, dtype=np.uint8)
+            ratio = self.config['feature_match_threshold']
+        else:
+            query = np.ascontiguousarray(query_descriptors, dtype=np.float32)
+            ratio = self.config['feature_match_threshold'] ** 2
+        
+        distances, neighbors = map_index.search(query, 2)
+        distances = distances.astype(np.float32)
+        
+        # Lowe's ratio test (rows without a second neighbor are dropped)
+        passed = np.flatnonzero(
+            (neighbors[:, 1] >= 0) & (distances[:, 0] < ratio * distances[:, 1])
+        )
+        best_dist = distances[passed, 0]
+        if not binary:
+            best_dist = np.sqrt(best_dist)
+        
+        return list(zip(passed.tolist(), neighbors[passed, 0].tolist(), best_dist.tolist()))
+
     async def process_new_map(self, map_id: str, map_request) -> bool:
         """Process and index a newly uploaded map"""
         
@@ -284,26 +491,24 @@ class MapMatcher:
             return False
 
     def _update_match_time(self, match_time: float):
-        """Update average match time statistics"""
-        
-        current_avg = self.stats['average_match_time']
-        total_matches = self.stats['total_matches']
-        
-        self.stats['average_match_time'] = \
-            (current_avg * (total_matches - 1) + match_time) / total_matches
+        """Accumulate match time; the average is derived in get_statistics"""
+        self.stats['total_match_time'] += match_time
 
     def get_statistics(self) -> Dict[str, Any]:
         """Get map matching statistics"""
         
         cache_hit_rate = 0.0
         success_rate = 0.0
+        average_match_time = 0.0
         
         if self.stats['total_matches'] > 0:
             cache_hit_rate = self.stats['cache_hits'] / self.stats['total_matches']
             success_rate = self.stats['successful_matches'] / self.stats['total_matches']
+            average_match_time = self.stats['total_match_time'] / self.stats['total_matches']
         
         return {
             **self.stats,
+            'average_match_time': average_match_time,
             'cache_hit_rate': cache_hit_rate,
             'success_rate': success_rate,
             'config': self.config
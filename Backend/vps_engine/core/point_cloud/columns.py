@@ -0,0 +1,34 @@
+"""
+VOXAR Spatial Platform - Point Cloud Column Reductions
+Per-axis helpers and shared sampling for (N, 3) point arrays
+
+Reducing a row-major (N, 3) array along its short axis runs NumPy's inner
+loop three elements at a time; walking the three columns separately keeps
+each reduction a single long strided pass.
+"""
+
+import numpy as np
+from typing import Tuple
+
+# Single generator for all point sampling in the package; seeded once from
+# OS entropy rather than on every call
+sample_rng = np.random.default_rng()
+
+def axis_bounds(points: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Per-axis minimum and maximum of an (N, 3) array"""
+    columns = [points[:, axis] for axis in range(points.shape[1])]
+    return (np.array([column.min() for column in columns]),
+            np.array([column.max() for column in columns]))
+
+def finite_rows(points: np.ndarray) -> np.ndarray:
+    """Mask of rows whose coordinates are all finite"""
+    mask = np.isfinite(points[:, 0])
+    for axis in range(1, points.shape[1]):
+        mask &= np.isfinite(points[:, axis])
+    return mask
+
+def sample_indices(count: int, size: int) -> np.ndarray:
+    """Draw size distinct indices from range(count)"""
+    # Generator.choice picks k of N without building an N-length permutation,
+    # unlike the legacy np.random.choice(replace=False)
+    return sample_rng.choice(count, size, replace=False, shuffle=False)
@@ -7,6 +7,13 @@ import logging
 import numpy as np
 from typing import Optional
 from .processor_models import PointCloudConfig
+from .columns import axis_bounds, finite_rows, sample_indices
+
+try:
+    import open3d as o3d
+    OPEN3D_AVAILABLE = True
+except ImportError:
+    OPEN3D_AVAILABLE = False
 
 logger = logging.getLogger(__name__)
 
@@ -66,7 +73,7 @@ class PointCloudFilter:
         """Remove NaN and infinite values from point cloud"""
         try:
             # Remove points with NaN or infinite coordinates
-            valid_mask = np.isfinite(points).all(axis=1)
+            valid_mask = finite_rows(points)
             valid_points = points[valid_mask]
             
             removed_count = len(points) - len(valid_points)
@@ -82,11 +89,7 @@ class PointCloudFilter:
     def _random_downsample(self, points: np.ndarray) -> np.ndarray:
         """Random downsampling for performance"""
         try:
-            indices = np.random.choice(
-                len(points), 
-                self.config.max_points, 
-                replace=False
-            )
+            indices = sample_indices(len(points), self.config.max_points)
             return points[indices]
             
         except Exception as e:
@@ -104,38 +107,60 @@ class PointCloudFilter:
             
             voxel_size = self.config.voxel_size
             
+            # Open3D's C++ voxel grid has no minimum occupancy, so it only
+            # covers the configuration that keeps every voxel. Its grid is
+            # anchored at the cloud's min bound rather than at multiples of
+            # voxel_size, so centroids differ from the NumPy path below
+            if OPEN3D_AVAILABLE and self.config.min_points_per_voxel <= 1:
+                downsampled = self._to_open3d(points).voxel_down_sample(voxel_size)
+                return np.asarray(downsampled.points, dtype=np.float32)
+            
             # Quantize points to voxel grid coordinates
-            voxel_coords = np.floor(points / voxel_size).astype(np.int32)
+            voxel_coords = np.floor(points / voxel_size).astype(np.int64)
             
             # Find unique voxels and their inverse mapping
-            unique_voxels, inverse_indices = np.unique(
-                voxel_coords, axis=0, return_inverse=True
-            )
-            
-            # Average points within each voxel
-            downsampled_points = []
-            for i in range(len(unique_voxels)):
-                # Get all points in this voxel
-                voxel_mask = (inverse_indices == i)
-                voxel_points = points[voxel_mask]
-                
-                # Only keep voxels with sufficient points
-                if len(voxel_points) >= self.config.min_points_per_voxel:
-                    centroid = np.mean(voxel_points, axis=0)
-                    downsampled_points.append(centroid)
-            
-            result = np.array(downsampled_points, dtype=np.float32) if downsampled_points else points
-            
-            if len(downsampled_points) == 0:
+            voxel_count, inverse_indices = self._voxel_inverse(voxel_coords)
+            
+            # Average points within each voxel via per-voxel weighted counts
+            counts = np.bincount(inverse_indices, minlength=voxel_count)
+            centroids = np.column_stack([
+                np.bincount(inverse_indices, weights=points[:, axis], minlength=voxel_count)
+                for axis in range(3)
+            ]) / counts[:, None]
+            
+            # Only keep voxels with sufficient points
+            keep = counts >= self.config.min_points_per_voxel
+            if not keep.any():
                 logger.warning("Voxel downsampling produced no points, returning original")
                 return points
             
-            return result
+            return centroids[keep].astype(np.float32)
             
         except Exception as e:
             logger.warning(f"Voxel downsampling failed: {e}")
             return points
     
+    @staticmethod
+    def _voxel_inverse(voxel_coords: np.ndarray):
+        """
+        Map each point's voxel to a dense voxel index
+        Packs the three coordinates into one int64 key so np.unique sorts
+        scalars instead of rows
+        """
+        min_coords, max_coords = axis_bounds(voxel_coords)
+        
+        # Mixed-radix key; fall back to row-wise unique if it cannot fit int64.
+        # Extents are Python ints since max - min + 1 can wrap in int64
+        extents = [int(high) - int(low) + 1 for low, high in zip(min_coords, max_coords)]
+        if extents[0] * extents[1] * extents[2] < 2 ** 62:
+            voxel_coords = voxel_coords - min_coords
+            keys = (voxel_coords[:, 0] * extents[1] + voxel_coords[:, 1]) * extents[2] + voxel_coords[:, 2]
+            unique_keys, inverse_indices = np.unique(keys, return_inverse=True)
+            return len(unique_keys), inverse_indices.ravel()
+        
+        unique_voxels, inverse_indices = np.unique(voxel_coords, axis=0, return_inverse=True)
+        return len(unique_voxels), inverse_indices.ravel()
+    
     def _remove_outliers(self, points: np.ndarray) -> np.ndarray:
         """
         Statistical outlier removal based on nearest neighbor analysis
@@ -146,23 +171,25 @@ class PointCloudFilter:
                 logger.info("Too few points for outlier removal")
                 return points
             
-            # Use efficient subset approach for large point clouds
-            max_subset_size = 10000
-            if len(points) > max_subset_size:
-                subset_indices = np.random.choice(len(points), max_subset_size, replace=False)
-                subset_points = points[subset_indices]
+            if OPEN3D_AVAILABLE:
+                # Open3D's statistical filter on its C++ KD-tree. Not identical
+                # to the fallback: the point itself counts among its neighbors
+                # and the threshold uses the sample standard deviation
+                _, inlier_indices = self._to_open3d(points).remove_statistical_outlier(
+                    nb_neighbors=self.config.outlier_nb_neighbors,
+                    std_ratio=self.config.outlier_std_ratio
+                )
+                filtered_points = points[np.asarray(inlier_indices, dtype=np.int64)]
             else:
-                subset_indices = np.arange(len(points))
-                subset_points = points
-            
-            # Calculate outlier threshold from subset
-            threshold = self._calculate_outlier_threshold(subset_points)
-            if threshold is None:
-                return points
-            
-            # Apply threshold to filter outliers
-            inlier_mask = self._filter_outliers_with_threshold(points, threshold)
-            filtered_points = points[inlier_mask]
+                # Mean k-NN distance of every point from a single KD-tree query
+                neighbor_distances = self._mean_neighbor_distances(points)
+                if neighbor_distances is None:
+                    return points
+                
+                # Apply statistical threshold to filter outliers
+                threshold = self._calculate_outlier_threshold(neighbor_distances)
+                inlier_mask = neighbor_distances <= threshold
+                filtered_points = points[inlier_mask]
             
             removed_count = len(points) - len(filtered_points)
             if removed_count > 0:
@@ -174,101 +201,27 @@ class PointCloudFilter:
             logger.warning(f"Outlier removal failed: {e}")
             return points
     
-    def _calculate_outlier_threshold(self, points: np.ndarray) -> Optional[float]:
-        """Calculate outlier threshold based on nearest neighbor distances"""
-        try:
-            from scipy.spatial.distance import cdist
-            
-            # Calculate pairwise distances
-            distances = cdist(points, points)
-            k = min(self.config.outlier_nb_neighbors, len(points) - 1)
-            
-            # Calculate mean distance to k nearest neighbors for each point
-            neighbor_distances = []
-            for i in range(len(points)):
-                # Sort distances and take k nearest (excluding self at index 0)
-                sorted_distances = np.sort(distances[i])[1:k+1]
-                if len(sorted_distances) > 0:
-                    neighbor_distances.append(np.mean(sorted_distances))
-            
-            if not neighbor_distances:
-                return None
-            
-            neighbor_distances = np.array(neighbor_distances)
-            
-            # Calculate statistical threshold
-            mean_distance = np.mean(neighbor_distances)
-            std_distance = np.std(neighbor_distances)
-            threshold = mean_distance + self.config.outlier_std_ratio * std_distance
-            
-            return threshold
-            
-        except Exception as e:
-            logger.warning(f"Threshold calculation failed: {e}")
-            return None
+    @staticmethod
+    def _to_open3d(points: np.ndarray):
+        """Wrap an Nx3 array as an Open3D point cloud"""
+        return o3d.geometry.PointCloud(
+            o3d.utility.Vector3dVector(np.asarray(points[:, :3], dtype=np.float64))
+        )
     
-    def _filter_outliers_with_threshold(self, points: np.ndarray, threshold: float) -> np.ndarray:
-        """Filter outliers using pre-calculated threshold"""
-        try:
-            from scipy.spatial.distance import cdist
-            
-            # For very large point clouds, use spatial approximation
-            if len(points) > 50000:
-                return self._approximate_outlier_filter(points, threshold)
-            
-            # Calculate exact distances for smaller point clouds
-            distances = cdist(points, points)
-            k = min(self.config.outlier_nb_neighbors, len(points) - 1)
-            
-            inlier_mask = np.ones(len(points), dtype=bool)
-            
-            for i in range(len(points)):
-                sorted_distances = np.sort(distances[i])[1:k+1]
-                if len(sorted_distances) > 0:
-                    mean_neighbor_distance = np.mean(sorted_distances)
-                    if mean_neighbor_distance > threshold:
-                        inlier_mask[i] = False
-            
-            return inlier_mask
-            
-        except Exception as e:
-            logger.warning(f"Outlier filtering failed: {e}")
-            return np.ones(len(points), dtype=bool)
+    def _mean_neighbor_distances(self, points: np.ndarray) -> Optional[np.ndarray]:
+        """Mean distance from each point to its k nearest neighbors (excluding itself)"""
+        from scipy.spatial import cKDTree
+        
+        k = min(self.config.outlier_nb_neighbors, len(points) - 1)
+        if k < 1:
+            return None
+        
+        # KD-tree k-NN query, parallel over all cores
+        distances, _ = cKDTree(points).query(points, k=k + 1, workers=-1)
+        return distances[:, 1:].mean(axis=1)
     
-    def _approximate_outlier_filter(self, points: np.ndarray, threshold: float) -> np.ndarray:
-        """Approximate outlier filtering for large point clouds"""
-        try:
-            # Use spatial subdivision for efficiency
-            grid_size = int(np.ceil(len(points) ** (1/3)))
-            
-            # Simple density-based filtering as approximation
-            min_coords = np.min(points, axis=0)
-            max_coords = np.max(points, axis=0)
-            ranges = max_coords - min_coords
-            ranges[ranges == 0] = 1.0  # Avoid division by zero
-            
-            # Create spatial grid
-            grid_indices = np.floor((points - min_coords) / ranges * grid_size).astype(int)
-            grid_indices = np.clip(grid_indices, 0, grid_size - 1)
-            
-            # Count points in each grid cell
-            inlier_mask = np.ones(len(points), dtype=bool)
-            
-            # Mark sparse regions as potential outliers
-            unique_cells, cell_counts = np.unique(
-                grid_indices, axis=0, return_counts=True
-            )
-            
-            sparse_threshold = max(1, len(points) // (grid_size ** 3) // 10)
-            
-            for i, (cell, count) in enumerate(zip(unique_cells, cell_counts)):
-                if count < sparse_threshold:
-                    # Mark points in sparse cells
-                    cell_mask = np.all(grid_indices == cell, axis=1)
-                    inlier_mask[cell_mask] = False
-            
-            return inlier_mask
-            
-        except Exception:
-            # Return all points as inliers if approximation fails
-            return np.ones(len(points), dtype=bool)
\ No newline at end of file
+    def _calculate_outlier_threshold(self, neighbor_distances: np.ndarray) -> float:
+        """Calculate outlier threshold from mean nearest neighbor distances"""
+        mean_distance = np.mean(neighbor_distances)
+        std_distance = np.std(neighbor_distances)
+        return mean_distance + self.config.outlier_std_ratio * std_distance
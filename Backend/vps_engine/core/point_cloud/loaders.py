@@ -3,12 +3,61 @@ VOXAR Spatial Platform - Point Cloud File Loaders
 Enterprise-grade point cloud file format parsers (PLY, PCD, XYZ)
 """
 
+import io
 import logging
+import multiprocessing
+import os
+import threading
+import warnings
 import numpy as np
-from typing import Optional
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Tuple
+from .columns import finite_rows
 
 logger = logging.getLogger(__name__)
 
+# PLY scalar property types to NumPy type codes (byte order added per file)
+PLY_TYPES = {
+    'char': 'i1', 'int8': 'i1', 'uchar': 'u1', 'uint8': 'u1',
+    'short': 'i2', 'int16': 'i2', 'ushort': 'u2', 'uint16': 'u2',
+    'int': 'i4', 'int32': 'i4', 'uint': 'u4', 'uint32': 'u4',
+    'float': 'f4', 'float32': 'f4', 'double': 'f8', 'float64': 'f8'
+}
+
+PLY_BYTE_ORDERS = {'binary_little_endian': '<', 'binary_big_endian': '>'}
+
+# Upper bound on PLY/PCD header size searched for the end of the header
+HEADER_SCAN_BYTES = 64 * 1024
+
+# ASCII bodies at least this large are parsed in line-aligned chunks across processes
+PARALLEL_PARSE_MIN_BYTES = 64 * 1024 * 1024
+
+_parse_pool: Optional[ProcessPoolExecutor] = None
+_parse_pool_lock = threading.Lock()
+
+def _get_parse_pool() -> ProcessPoolExecutor:
+    """
+    Lazily start the ASCII parsing worker processes
+    np.loadtxt holds the GIL while parsing, so threads would not run chunks in
+    parallel; workers are spawned rather than forked from the threaded server
+    """
+    global _parse_pool
+    with _parse_pool_lock:
+        if _parse_pool is None:
+            _parse_pool = ProcessPoolExecutor(
+                max_workers=os.cpu_count(),
+                mp_context=multiprocessing.get_context('spawn')
+            )
+        return _parse_pool
+
+def _reset_parse_pool():
+    """Drop a broken worker pool so the next parse starts a fresh one"""
+    global _parse_pool
+    with _parse_pool_lock:
+        if _parse_pool is not None:
+            _parse_pool.shutdown(wait=False, cancel_futures=True)
+            _parse_pool = None
+
 class PointCloudLoader:
     """
     Enterprise point cloud file loader supporting multiple formats
@@ -24,11 +73,12 @@ class PointCloudLoader:
             point_cloud_data: Raw point cloud file data
             
         Returns:
-            numpy array of 3D points or None if loading fails
+            numpy array of 3D points or None if loading fails; every
+            returned point is finite
         """
         try:
             # Auto-detect format and load accordingly
-            if point_cloud_data.startswith(b'ply'):
+            if point_cloud_data[:3] == b'ply':
                 return PointCloudLoader._load_ply(point_cloud_data)
             elif b'PCD' in point_cloud_data[:100]:
                 return PointCloudLoader._load_pcd(point_cloud_data)
@@ -42,137 +92,262 @@ class PointCloudLoader:
     
     @staticmethod
     def _load_ply(data: bytes) -> Optional[np.ndarray]:
-        """Load PLY format point cloud with ASCII parsing"""
+        """Load PLY format point cloud with ASCII or binary parsing"""
         try:
-            lines = data.decode('utf-8').split('\n')
-            
-            # Parse header to find vertex count and data start
-            vertex_count = 0
-            header_end = 0
+            header, body_start = PointCloudLoader._split_header(data, b'end_header')
+            if header is None:
+                logger.warning("No end_header found in PLY file")
+                return None
             
-            for i, line in enumerate(lines):
-                if line.startswith('element vertex'):
-                    vertex_count = int(line.split()[-1])
-                elif line.strip() == 'end_header':
-                    header_end = i + 1
-                    break
+            # Parse header into format and elements (name, count, properties)
+            ply_format = 'ascii'
+            elements = []
+            for line in header.splitlines():
+                tokens = line.split()
+                if not tokens:
+                    continue
+                if tokens[0] == 'format':
+                    ply_format = tokens[1]
+                elif tokens[0] == 'element':
+                    elements.append((tokens[1], int(tokens[2]), []))
+                elif tokens[0] == 'property' and elements:
+                    elements[-1][2].append(tokens[1:])
             
+            vertex_count = next((count for name, count, _ in elements if name == 'vertex'), 0)
             if vertex_count == 0:
                 logger.warning("No vertices found in PLY header")
                 return None
             
-            # Parse vertex data
-            points = []
-            for i in range(header_end, min(header_end + vertex_count, len(lines))):
-                if lines[i].strip():
-                    coords = lines[i].strip().split()
-                    if len(coords) >= 3:
-                        try:
-                            x, y, z = float(coords[0]), float(coords[1]), float(coords[2])
-                            # Basic validation
-                            if all(np.isfinite([x, y, z])):
-                                points.append([x, y, z])
-                        except ValueError:
-                            continue
-            
-            if not points:
+            if ply_format == 'ascii':
+                # Parse vertex rows; any face rows follow them
+                points = PointCloudLoader._parse_ascii_points(data[body_start:], max_rows=vertex_count)
+            else:
+                points = PointCloudLoader._load_ply_binary(data, body_start, ply_format, elements)
+            
+            if len(points) == 0:
                 logger.warning("No valid points found in PLY file")
                 return None
             
             logger.info(f"Loaded {len(points)} points from PLY format")
-            return np.array(points, dtype=np.float32)
+            return points
             
         except Exception as e:
             logger.error(f"PLY parsing failed: {e}")
             return None
     
+    @staticmethod
+    def _load_ply_binary(data: bytes, body_start: int, ply_format: str, elements: list) -> np.ndarray:
+        """View the vertex element of a binary PLY body as a structured array"""
+        byte_order = PLY_BYTE_ORDERS.get(ply_format)
+        if byte_order is None:
+            raise ValueError(f"Unknown PLY format '{ply_format}'")
+        
+        offset = body_start
+        for name, count, properties in elements:
+            # Variable-length rows cannot be skipped without parsing them
+            if any(prop[0] == 'list' for prop in properties):
+                raise ValueError(f"List properties in PLY element '{name}' before vertex data")
+            
+            dtype = np.dtype([(prop[-1], byte_order + PLY_TYPES[prop[0]]) for prop in properties])
+            if name == 'vertex':
+                vertices = np.frombuffer(data, dtype=dtype, count=count, offset=offset)
+                return PointCloudLoader._xyz_from_records(vertices)
+            
+            offset += count * dtype.itemsize
+        
+        raise ValueError("No vertex element in PLY header")
+    
     @staticmethod
     def _load_pcd(data: bytes) -> Optional[np.ndarray]:
-        """Load PCD format point cloud with ASCII parsing"""
+        """Load PCD format point cloud with ASCII or binary parsing"""
         try:
-            lines = data.decode('utf-8').split('\n')
-            
-            # Find data section start
-            data_start = 0
-            for i, line in enumerate(lines):
-                if line.startswith('DATA ascii'):
-                    data_start = i + 1
-                    break
-                elif line.startswith('DATA binary'):
-                    logger.warning("Binary PCD format not supported")
-                    return None
-            
-            if data_start == 0:
-                logger.warning("No ASCII data section found in PCD")
+            header, body_start = PointCloudLoader._split_header(data, b'DATA')
+            if header is None:
+                logger.warning("No data section found in PCD")
+                return None
+            
+            # Header entries are upper-case keywords followed by values
+            fields = {}
+            for line in header.splitlines():
+                tokens = line.split()
+                if tokens and tokens[0].isupper():
+                    fields[tokens[0]] = tokens[1:]
+            
+            data_format = fields['DATA'][0] if fields['DATA'] else ''
+            if data_format == 'ascii':
+                points = PointCloudLoader._parse_ascii_points(data[body_start:])
+            elif data_format == 'binary':
+                points = PointCloudLoader._load_pcd_binary(data, body_start, fields)
+            else:
+                logger.warning(f"PCD data format '{data_format}' not supported")
                 return None
             
-            # Parse point data
-            points = []
-            for i in range(data_start, len(lines)):
-                if lines[i].strip():
-                    coords = lines[i].strip().split()
-                    if len(coords) >= 3:
-                        try:
-                            x, y, z = float(coords[0]), float(coords[1]), float(coords[2])
-                            # Basic validation
-                            if all(np.isfinite([x, y, z])):
-                                points.append([x, y, z])
-                        except ValueError:
-                            continue
-            
-            if not points:
+            if len(points) == 0:
                 logger.warning("No valid points found in PCD file")
                 return None
             
             logger.info(f"Loaded {len(points)} points from PCD format")
-            return np.array(points, dtype=np.float32)
+            return points
             
         except Exception as e:
             logger.error(f"PCD parsing failed: {e}")
             return None
     
+    @staticmethod
+    def _load_pcd_binary(data: bytes, body_start: int, fields: dict) -> np.ndarray:
+        """View a binary PCD body as a structured array built from FIELDS/SIZE/TYPE/COUNT"""
+        names = fields['FIELDS']
+        sizes = fields['SIZE']
+        types = fields['TYPE']
+        counts = fields.get('COUNT', ['1'] * len(names))
+        
+        # Padding fields may repeat a name ('_'), so those get positional names
+        dtype = np.dtype([
+            (name if names.count(name) == 1 else f'_{index}',
+             f'<{field_type.lower()}{size}',
+             (int(count),) if int(count) > 1 else ())
+            for index, (name, size, field_type, count) in enumerate(zip(names, sizes, types, counts))
+        ])
+        
+        if 'POINTS' in fields:
+            point_count = int(fields['POINTS'][0])
+        else:
+            point_count = int(fields['WIDTH'][0]) * int(fields['HEIGHT'][0])
+        
+        records = np.frombuffer(data, dtype=dtype, count=point_count, offset=body_start)
+        return PointCloudLoader._xyz_from_records(records)
+    
+    @staticmethod
+    def _xyz_from_records(records: np.ndarray) -> np.ndarray:
+        """Stack the x/y/z fields of a structured array into finite Nx3 float32 points"""
+        # Filter on the field columns before interleaving them
+        x, y, z = records['x'], records['y'], records['z']
+        finite = np.isfinite(x) & np.isfinite(y) & np.isfinite(z)
+        return np.stack([x[finite], y[finite], z[finite]], axis=1).astype(np.float32, copy=False)
+    
     @staticmethod
     def _load_xyz(data: bytes) -> Optional[np.ndarray]:
         """Load simple XYZ format point cloud (space/tab separated coordinates)"""
         try:
-            lines = data.decode('utf-8').split('\n')
-            
-            points = []
-            line_count = 0
-            
-            for line in lines:
-                line_count += 1
-                if line.strip():
-                    # Handle both space and tab separation
-                    coords = line.strip().replace('\t', ' ').split()
-                    if len(coords) >= 3:
-                        try:
-                            x, y, z = float(coords[0]), float(coords[1]), float(coords[2])
-                            # Basic validation
-                            if all(np.isfinite([x, y, z])):
-                                points.append([x, y, z])
-                        except ValueError:
-                            # Skip malformed lines
-                            continue
-            
-            if not points:
-                logger.warning(f"No valid points found in XYZ file ({line_count} lines processed)")
+            points = PointCloudLoader._parse_ascii_points(data)
+            
+            if len(points) == 0:
+                logger.warning(f"No valid points found in XYZ file ({len(data)} bytes processed)")
                 return None
             
             logger.info(f"Loaded {len(points)} points from XYZ format")
-            return np.array(points, dtype=np.float32)
+            return points
             
         except Exception as e:
             logger.error(f"XYZ parsing failed: {e}")
             return None
     
     @staticmethod
-    def validate_point_cloud(points: np.ndarray) -> bool:
+    def _split_header(data: bytes, last_keyword: bytes) -> Tuple[Optional[str], int]:
+        """
+        Locate the header line starting with last_keyword
+        
+        Returns:
+            Decoded header up to and including that line, and the byte offset
+            where the body starts; (None, 0) if the line is missing
+        """
+        # Headers are small; never scan into (possibly binary) body data
+        scan_end = min(len(data), HEADER_SCAN_BYTES)
+        
+        if data[:len(last_keyword)] == last_keyword:
+            line_start = 0
+        else:
+            line_start = data.find(b'\n' + last_keyword, 0, scan_end)
+            if line_start < 0:
+                return None, 0
+            line_start += 1
+        
+        line_end = data.find(b'\n', line_start, scan_end)
+        if line_end < 0:
+            if scan_end < len(data):
+                return None, 0
+            body_start = len(data)
+        else:
+            body_start = line_end + 1
+        return data[:body_start].decode('ascii', errors='replace'), body_start
+    
+    @staticmethod
+    def _parse_ascii_points(body: bytes, max_rows: Optional[int] = None) -> np.ndarray:
+        """
+        Parse the first three columns of whitespace separated rows as float32 XYZ
+        Large bodies, including PLY vertex rows once cut to max_rows lines, are
+        split across worker processes
+        """
+        if max_rows is not None:
+            # Cut at the max_rows-th line so rows dropped as malformed are not
+            # replaced by the lines after them (PLY face rows)
+            newlines = np.flatnonzero(np.frombuffer(body, dtype=np.uint8) == ord('\n'))
+            if len(newlines) >= max_rows:
+                body = body[:newlines[max_rows - 1] + 1]
+        
+        workers = os.cpu_count() or 1
+        if workers > 1 and len(body) >= PARALLEL_PARSE_MIN_BYTES:
+            chunks = PointCloudLoader._split_lines(body, workers)
+            try:
+                return np.concatenate(list(
+                    _get_parse_pool().map(PointCloudLoader._parse_ascii_rows, chunks)
+                ))
+            except Exception as e:
+                logger.warning(f"Parallel ASCII parsing failed, parsing serially: {e}")
+                _reset_parse_pool()
+        
+        return PointCloudLoader._parse_ascii_rows(body)
+    
+    @staticmethod
+    def _split_lines(body: bytes, parts: int) -> List[bytes]:
+        """Split a body into up to parts chunks that end on line boundaries"""
+        bounds = [0]
+        for part in range(1, parts):
+            cut = body.find(b'\n', len(body) * part // parts)
+            if cut < 0:
+                break
+            if cut + 1 > bounds[-1]:
+                bounds.append(cut + 1)
+        bounds.append(len(body))
+        
+        return [body[start:end] for start, end in zip(bounds, bounds[1:]) if end > start]
+    
+    @staticmethod
+    def _parse_ascii_rows(body: bytes) -> np.ndarray:
+        """
+        Parse rows with np.loadtxt in the current process
+        Rows that are malformed or not finite are dropped
+        """
+        # Empty bodies and skipped rows are reported through the return value
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            try:
+                points = np.loadtxt(
+                    io.BytesIO(body), dtype=np.float32, usecols=(0, 1, 2), ndmin=2
+                )
+            except ValueError:
+                # Short or non-numeric rows; the tolerant parser skips or NaN-fills them
+                points = np.genfromtxt(
+                    io.BytesIO(body), dtype=np.float32, usecols=(0, 1, 2),
+                    invalid_raise=False, ndmin=2
+                )
+        
+        return points[finite_rows(points)]
+    
+    @staticmethod
+    def shutdown():
+        """Stop the ASCII parsing worker processes, if any were started"""
+        _reset_parse_pool()
+    
+    @staticmethod
+    def validate_point_cloud(points: np.ndarray, check_finite: bool = True) -> bool:
         """
         Validate loaded point cloud data
         
         Args:
             points: Point cloud array to validate
+            check_finite: Scan for NaN or infinite values; load_point_cloud
+                output is already finite and can skip this pass
             
         Returns:
             True if valid, False otherwise
@@ -189,7 +364,7 @@ class PointCloudLoader:
             return False
             
         # Check for NaN or infinite values
-        if not np.all(np.isfinite(points)):
+        if check_finite and not np.all(np.isfinite(points)):
             logger.warning("Point cloud contains NaN or infinite values")
             return False
             
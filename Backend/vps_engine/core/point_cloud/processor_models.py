@@ -53,10 +53,10 @@ class ProcessingStats:
         self.total_processed += 1
         total = self.total_processed
         
-        # Update running averages
-        self.average_points_in = ((self.average_points_in * (total - 1)) + points_in) / total
-        self.average_points_out = ((self.average_points_out * (total - 1)) + points_out) / total
-        self.average_processing_time = ((self.average_processing_time * (total - 1)) + processing_time) / total
+        # Update running averages incrementally (Welford), without re-weighting the old mean
+        self.average_points_in += (points_in - self.average_points_in) / total
+        self.average_points_out += (points_out - self.average_points_out) / total
+        self.average_processing_time += (processing_time - self.average_processing_time) / total
     
     def to_dict(self) -> Dict[str, Any]:
         """Convert to dictionary for monitoring"""
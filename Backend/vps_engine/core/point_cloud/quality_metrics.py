@@ -7,6 +7,7 @@ import logging
 import numpy as np
 from typing import Dict, Optional
 from .processor_models import QualityMetrics
+from .columns import axis_bounds, sample_indices
 
 logger = logging.getLogger(__name__)
 
@@ -34,11 +35,14 @@ class QualityAnalyzer:
             
             logger.info(f"Calculating quality metrics for {len(points)} points")
             
+            # Bounds are shared by the volume and coverage metrics
+            min_coords, max_coords = axis_bounds(points)
+            
             # Calculate individual metrics
-            bbox_volume = QualityAnalyzer._calculate_bbox_volume(points)
+            bbox_volume = QualityAnalyzer._calculate_bbox_volume(min_coords, max_coords)
             density = QualityAnalyzer._calculate_density(points, bbox_volume)
             uniformity = QualityAnalyzer._calculate_uniformity(points)
-            coverage = QualityAnalyzer._calculate_coverage(points)
+            coverage = QualityAnalyzer._calculate_coverage(points, min_coords, max_coords)
             
             return QualityMetrics(
                 density=density,
@@ -53,14 +57,9 @@ class QualityAnalyzer:
             return QualityMetrics()
     
     @staticmethod
-    def _calculate_bbox_volume(points: np.ndarray) -> float:
+    def _calculate_bbox_volume(min_coords: np.ndarray, max_coords: np.ndarray) -> float:
         """Calculate bounding box volume"""
         try:
-            if len(points) == 0:
-                return 0.0
-            
-            min_coords = np.min(points, axis=0)
-            max_coords = np.max(points, axis=0)
             dimensions = max_coords - min_coords
             
             # Handle degenerate cases (2D or 1D point clouds)
@@ -99,7 +98,7 @@ class QualityAnalyzer:
             # Use efficient sampling for large point clouds
             sample_size = min(2000, len(points))
             if len(points) > sample_size:
-                indices = np.random.choice(len(points), sample_size, replace=False)
+                indices = sample_indices(len(points), sample_size)
                 sample_points = points[indices]
             else:
                 sample_points = points
@@ -132,26 +131,22 @@ class QualityAnalyzer:
     def _calculate_nearest_neighbor_distances(points: np.ndarray) -> np.ndarray:
         """Calculate nearest neighbor distances efficiently"""
         try:
-            from scipy.spatial.distance import cdist
-            
-            # Calculate pairwise distances
-            distances = cdist(points, points)
+            from scipy.spatial import cKDTree
             
-            # Extract nearest neighbor distances (excluding self)
-            nn_distances = []
-            for i in range(len(points)):
-                sorted_distances = np.sort(distances[i])
-                if len(sorted_distances) > 1:
-                    nn_distances.append(sorted_distances[1])  # First non-zero distance
+            if len(points) < 2:
+                return np.array([])
             
-            return np.array(nn_distances)
+            # Two nearest neighbors per point; the first is the point itself
+            distances, _ = cKDTree(points).query(points, k=2, workers=-1)
+            return distances[:, 1]
             
         except Exception as e:
             logger.warning(f"Nearest neighbor distance calculation failed: {e}")
             return np.array([])
     
     @staticmethod
-    def _calculate_coverage(points: np.ndarray) -> float:
+    def _calculate_coverage(points: np.ndarray, min_coords: np.ndarray,
+                            max_coords: np.ndarray) -> float:
         """
         Calculate spatial coverage ratio using grid-based occupancy analysis
         Returns value between 0 (poor coverage) and 1 (excellent coverage)
@@ -163,8 +158,6 @@ class QualityAnalyzer:
             # Use adaptive grid resolution based on point count
             grid_resolution = min(20, max(5, int(np.ceil(len(points) ** (1/3) / 10))))
             
-            min_coords = np.min(points, axis=0)
-            max_coords = np.max(points, axis=0)
             ranges = max_coords - min_coords
             
             # Handle degenerate cases
@@ -182,8 +175,7 @@ class QualityAnalyzer:
             grid_indices = np.clip(grid_indices, 0, grid_resolution - 1)
             
             # Mark occupied cells
-            for i, j, k in grid_indices:
-                occupancy_grid[i, j, k] = True
+            occupancy_grid[grid_indices[:, 0], grid_indices[:, 1], grid_indices[:, 2]] = True
             
             # Calculate coverage ratio
             occupied_cells = np.sum(occupancy_grid)
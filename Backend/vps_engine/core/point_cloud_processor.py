@@ -66,7 +66,7 @@ class PointCloudProcessor:
                 return None
             
             # Validate loaded point cloud
-            if not self.loader.validate_point_cloud(points):
+            if not self.loader.validate_point_cloud(points, check_finite=False):
                 logger.error(f"Point cloud validation failed for map {map_id}")
                 return None
             
@@ -178,6 +178,12 @@ class PointCloudProcessor:
             'processor_version': 'enterprise_modular_v1.0'
         }
     
+    def shutdown(self):
+        """Stop the loader thread pool and any ASCII parsing worker processes"""
+        self.executor.shutdown(wait=True)
+        self.loader.shutdown()
+        logger.info("Point cloud processor shut down")
+    
     def __del__(self):
         """Enterprise cleanup of resources"""
         try:
@@ -6,7 +6,7 @@ Handles 3D reconstruction, feature matching, and pose estimation
 import asyncio
 import logging
 import numpy as np
-from typing import Dict, List, Optional, Tuple, Any
+from typing import Dict, List, Optional, Set, Tuple, Any
 from dataclasses import dataclass
 import cv2
 from datetime import datetime, timedelta
@@ -53,6 +53,10 @@ class VPSEngine:
         self.metrics = None
         self.is_initialized = False
         
+        # Dynamic batching of feature extraction across concurrent requests
+        self._batch_queue: Optional[asyncio.Queue] = None
+        self._batch_task: Optional[asyncio.Task] = None
+        
         # Engine configuration
         self.config = {
             'min_feature_matches': 50,
@@ -88,7 +92,10 @@ class VPSEngine:
             await self.storage_service.initialize()
             
             # Initialize core components
-            self.feature_extractor = FeatureExtractor()
+            self.feature_extractor = FeatureExtractor(
+                detector_backend=settings.FEATURE_DETECTOR_BACKEND,
+                max_long_edge=settings.VPS_MAX_IMAGE_SIZE
+            )
             self.point_cloud_processor = PointCloudProcessor()
             self.map_matcher = MapMatcher(self.db_service, self.cache_service)
             self.pose_estimator = PoseEstimator()
@@ -96,6 +103,11 @@ class VPSEngine:
             # Initialize metrics
             self.metrics = VPSMetrics()
             
+            # Start feature extraction batcher
+            if settings.VPS_MAX_BATCH > 1:
+                self._batch_queue = asyncio.Queue()
+                self._batch_task = asyncio.create_task(self._feature_batch_loop())
+            
             self.is_initialized = True
             logger.info("✅ VPS Engine initialized successfully")
             
@@ -110,7 +122,7 @@ class VPSEngine:
         Perform visual localization using the provided image
         
         Args:
-            image: Input camera image (RGB)
+            image: Input camera image (BGR)
             camera_intrinsics: Camera intrinsic matrix (3x3)
             approximate_location: Optional GPS coordinates (lat, lng)
             map_id: Optional specific map to match against
@@ -128,9 +140,12 @@ class VPSEngine:
             logger.info(f"Starting VPS localization (map_id: {map_id})")
             
             # Extract features from input image
-            features = await self.feature_extractor.extract_features(image)
-            if len(features.keypoints) < self.config['min_feature_matches']:
-                raise ValueError(f"Insufficient features: {len(features.keypoints)}")
+            if self._batch_queue is not None:
+                features = await self._extract_features_batched(image)
+            else:
+                features = await self.feature_extractor.extract_features(image)
+            if features.feature_count < self.config['min_feature_matches']:
+                raise ValueError(f"Insufficient features: {features.feature_count}")
             
             # Find candidate maps
             candidate_maps = await self.map_matcher.find_candidate_maps(
@@ -143,20 +158,21 @@ class VPSEngine:
             best_result = None
             best_confidence = 0.0
             
-            # Try localization against each candidate map
-            for map_data in candidate_maps:
-                try:
-                    result = await self._localize_against_map(
-                        features, camera_intrinsics, map_data
-                    )
-                    
-                    if result.confidence > best_confidence:
-                        best_result = result
-                        best_confidence = result.confidence
-                        
-                except Exception as e:
-                    logger.warning(f"Localization failed for map {map_data['id']}: {e}")
+            # Try localization against all candidate maps concurrently; matching
+            # runs in worker threads so the maps overlap
+            results = await asyncio.gather(*[
+                self._localize_against_map(features, camera_intrinsics, map_data)
+                for map_data in candidate_maps
+            ], return_exceptions=True)
+            
+            for map_data, result in zip(candidate_maps, results):
+                if isinstance(result, BaseException):
+                    logger.warning(f"Localization failed for map {map_data['id']}: {result}")
                     continue
+                
+                if result.confidence > best_confidence:
+                    best_result = result
+                    best_confidence = result.confidence
             
             if not best_result or best_confidence < self.config['confidence_threshold']:
                 self.performance_stats['failed_localizations'] += 1
@@ -194,6 +210,73 @@ class VPSEngine:
             logger.error(f"❌ VPS localization failed: {e}")
             raise
 
+    async def _extract_features_batched(self, image: np.ndarray):
+        """Queue an image for the next feature extraction batch"""
+        future = asyncio.get_running_loop().create_future()
+        await self._batch_queue.put((image, future))
+        return await future
+
+    async def _feature_batch_loop(self):
+        """Collect queued images into batches and extract each batch in its own task"""
+        queue = self._batch_queue
+        max_batch = settings.VPS_MAX_BATCH
+        in_flight: Set[asyncio.Task] = set()
+        batch = []
+        
+        try:
+            while True:
+                batch = [await queue.get()]
+                
+                # Take only what is already queued; never hold a request back
+                # waiting for more to arrive
+                while len(batch) < max_batch and not queue.empty():
+                    batch.append(queue.get_nowait())
+                
+                # Not awaited here, so later requests reach the extractor's idle
+                # workers instead of queueing behind this batch
+                task = asyncio.create_task(self._extract_feature_batch(batch))
+                in_flight.add(task)
+                task.add_done_callback(in_flight.discard)
+                batch = []
+                
+        except asyncio.CancelledError:
+            # Fail in-flight batches and everything still queued so no
+            # localize call waits forever on a batcher that is gone
+            for task in in_flight:
+                task.cancel()
+            await asyncio.gather(*in_flight, return_exceptions=True)
+            while not queue.empty():
+                batch.append(queue.get_nowait())
+            self._fail_feature_batch(batch)
+            raise
+
+    async def _extract_feature_batch(self, batch: List[Tuple[np.ndarray, asyncio.Future]]):
+        """Extract features for one batch and resolve each request's future"""
+        try:
+            results = await self.feature_extractor.extract_features_batch(
+                [image for image, _ in batch], return_exceptions=True
+            )
+        except asyncio.CancelledError:
+            self._fail_feature_batch(batch)
+            raise
+        except Exception as e:
+            results = [e] * len(batch)
+        
+        for (_, future), result in zip(batch, results):
+            if future.done():
+                continue
+            if isinstance(result, BaseException):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    @staticmethod
+    def _fail_feature_batch(batch: List[Tuple[np.ndarray, asyncio.Future]]):
+        """Fail every pending request of a batch because the engine is stopping"""
+        for _, future in batch:
+            if not future.done():
+                future.set_exception(RuntimeError("VPS engine is shutting down"))
+
     async def _localize_against_map(self, features, camera_intrinsics: np.ndarray, 
                                    map_data: Dict) -> VPSResult:
         """Perform localization against a specific map"""
@@ -361,6 +444,13 @@ class VPSEngine:
         logger.info("Shutting down VPS Engine...")
         
         try:
+            if self._batch_task:
+                # New requests extract directly; queued ones are failed by the loop
+                batch_task, self._batch_task = self._batch_task, None
+                self._batch_queue = None
+                batch_task.cancel()
+                await asyncio.gather(batch_task, return_exceptions=True)
+            
             if self.db_service:
                 await self.db_service.shutdown()
             
@@ -370,6 +460,10 @@ class VPSEngine:
             if self.storage_service:
                 await self.storage_service.shutdown()
             
+            if self.point_cloud_processor:
+                # Joins the loader threads, so keep it off the event loop
+                await asyncio.to_thread(self.point_cloud_processor.shutdown)
+            
             self.is_initialized = False
             logger.info("✅ VPS Engine shutdown complete")
             
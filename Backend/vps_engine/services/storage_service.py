@@ -99,6 +99,32 @@ class StorageService:
             logger.error(f"Failed to store point cloud: {e}")
             return False
 
+    async def store_point_cloud_file(self, map_id: str, file_obj, length: Optional[int] = None) -> bool:
+        """Stream point cloud data for a map from a file object without buffering it in memory"""
+        try:
+            object_name = f"{self.paths['point_clouds']}{map_id}.ply"
+            
+            # Unknown length falls back to multipart upload in 10MB parts
+            loop = asyncio.get_event_loop()
+            await loop.run_in_executor(
+                None,
+                lambda: self.client.put_object(
+                    self.bucket_name,
+                    object_name,
+                    file_obj,
+                    length if length is not None else -1,
+                    content_type="application/octet-stream",
+                    part_size=0 if length is not None else 10 * 1024 * 1024
+                )
+            )
+            
+            logger.info(f"Stored point cloud for map {map_id}")
+            return True
+            
+        except Exception as e:
+            logger.error(f"Failed to store point cloud: {e}")
+            return False
+
     async def get_point_cloud(self, map_id: str) -> Optional[bytes]:
         """Get point cloud data for a map"""
         try:
@@ -0,0 +1,72 @@
+"""
+Map matcher tests - GEMM L2 matching against OpenCV brute force
+"""
+
+import cv2
+import numpy as np
+
+from core.map_matcher import MapMatcher
+
+def _bf_ratio_matches(query, train, ratio):
+    """Lowe's ratio test over cv2.BFMatcher(NORM_L2) 2-NN, the original L2 path"""
+    matcher = cv2.BFMatcher(cv2.NORM_L2, crossCheck=False)
+    matches = []
+    for pair in matcher.knnMatch(query, train, k=2):
+        if len(pair) == 2 and pair[0].distance < ratio * pair[1].distance:
+            matches.append((pair[0].queryIdx, pair[0].trainIdx, pair[0].distance))
+    return matches
+
+def _sift_like(rng, count):
+    return rng.integers(0, 256, size=(count, 128)).astype(np.float32)
+
+def test_gemm_matches_bf_matcher():
+    rng = np.random.default_rng(0)
+    map_descriptors = _sift_like(rng, 3000)
+    # Noisy copies of map rows pass the ratio test; random rows mostly fail it
+    sources = rng.choice(len(map_descriptors), 300, replace=False)
+    query = np.concatenate([
+        map_descriptors[sources] + rng.normal(0, 8, size=(300, 128)).astype(np.float32),
+        _sift_like(rng, 200)
+    ])
+    matcher = MapMatcher(None, None)
+    
+    gemm = matcher._match_descriptors_gemm(query, map_descriptors, map_id="m1")
+    expected = _bf_ratio_matches(query, map_descriptors, matcher.config['feature_match_threshold'])
+    
+    assert [m[:2] for m in gemm] == [m[:2] for m in expected]
+    np.testing.assert_allclose([m[2] for m in gemm], [m[2] for m in expected], rtol=1e-3)
+    assert all(t == sources[q] for q, t, _ in gemm if q < 300)
+
+def test_gemm_uses_cached_norms_across_blocks(monkeypatch):
+    import core.map_matcher as map_matcher
+    
+    # Force several query blocks to cover the block offset bookkeeping
+    monkeypatch.setattr(map_matcher, 'MATCH_BLOCK_ENTRIES', 64 * 500)
+    rng = np.random.default_rng(1)
+    map_descriptors = _sift_like(rng, 500)
+    query = map_descriptors[rng.permutation(500)[:200]] + 1.0
+    matcher = MapMatcher(None, None)
+    
+    first = matcher._match_descriptors_gemm(query, map_descriptors, map_id="m1")
+    second = matcher._match_descriptors_gemm(query, map_descriptors, map_id="m1")
+    expected = _bf_ratio_matches(query, map_descriptors, matcher.config['feature_match_threshold'])
+    
+    assert first == second
+    assert [m[:2] for m in first] == [m[:2] for m in expected]
+
+def test_ratio_test_top2_matches_full_sort():
+    rng = np.random.default_rng(2)
+    distances = rng.random((400, 50)).astype(np.float32)
+    # Rows with a clear nearest neighbor, and rows with a tie at the minimum
+    distances[:100, 7] = 0.01
+    distances[100:120, 3] = distances[100:120, 9] = 0.0
+    ratio = 0.49
+    
+    passed, best_map, best_dist = MapMatcher._ratio_test_top2(distances, ratio)
+    
+    order = np.argsort(distances, axis=1, kind='stable')
+    sorted_dist = np.take_along_axis(distances, order, axis=1)
+    expected = np.flatnonzero(sorted_dist[:, 0] < ratio * sorted_dist[:, 1])
+    np.testing.assert_array_equal(passed, expected)
+    np.testing.assert_array_equal(best_map, order[expected, 0])
+    np.testing.assert_array_equal(best_dist, sorted_dist[expected, 0])
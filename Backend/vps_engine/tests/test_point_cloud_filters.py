@@ -0,0 +1,58 @@
+"""
+Point cloud filter tests - voxel key packing
+"""
+
+import numpy as np
+import pytest
+
+from core.point_cloud.filters import PointCloudFilter
+
+INT64 = np.iinfo(np.int64)
+
+def _assert_same_voxels(voxel_coords):
+    """Packed grouping must equal the row-wise np.unique grouping"""
+    count, inverse = PointCloudFilter._voxel_inverse(voxel_coords)
+    unique_voxels, expected = np.unique(voxel_coords, axis=0, return_inverse=True)
+    
+    assert count == len(unique_voxels)
+    # Dense indices may be numbered differently; the partition must match
+    pairs = np.unique(np.stack([inverse, expected.ravel()], axis=1), axis=0)
+    assert len(pairs) == count
+
+def _coords(rng, low, high, size=2000):
+    coords = rng.integers(low, high, size=(size, 3), dtype=np.int64, endpoint=True)
+    # Repeat rows so several points share each voxel
+    return np.concatenate([coords, coords[::3]])
+
+@pytest.mark.parametrize("extent", [1, 2 ** 20, 2 ** 20 + 1, 2 ** 21, 2 ** 31])
+def test_packed_keys_match_row_unique(extent):
+    rng = np.random.default_rng(extent)
+    _assert_same_voxels(_coords(rng, -extent // 2, extent - extent // 2 - 1))
+
+def test_extents_just_below_packing_limit():
+    # 2**21 * 2**20 * (2**21 - 1) < 2**62, so keys are packed near the top of the range
+    rng = np.random.default_rng(1)
+    coords = _coords(rng, 0, 2 ** 20 - 1)
+    coords[:, 0] *= 2
+    coords[0] = [0, 0, 0]
+    coords[1] = [2 ** 21 - 1, 2 ** 20 - 1, 2 ** 21 - 2]
+    _assert_same_voxels(coords)
+
+@pytest.mark.parametrize("low, high", [
+    (INT64.max - 1000, INT64.max),
+    (INT64.min, INT64.min + 1000),
+    (INT64.min, INT64.max),
+    (INT64.min // 2, INT64.max // 2),
+])
+def test_coordinates_near_int64_limits(low, high):
+    rng = np.random.default_rng(2)
+    coords = _coords(rng, low, high)
+    coords[0] = [low, low, low]
+    coords[1] = [high, high, high]
+    _assert_same_voxels(coords)
+
+def test_full_int64_span_with_shared_columns():
+    # Every combination of three values per axis; rows differ only in some columns
+    values = np.array([INT64.min, 0, INT64.max], dtype=np.int64)
+    grid = np.stack(np.meshgrid(values, values, values, indexing='ij'), axis=-1).reshape(-1, 3)
+    _assert_same_voxels(np.concatenate([grid, grid[::2]]))
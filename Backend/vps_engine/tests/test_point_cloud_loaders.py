@@ -0,0 +1,205 @@
+"""
+Point cloud loader tests - parity with the original per-line parsers and
+between the serial and multi-process ASCII parsers
+"""
+
+import os
+
+import numpy as np
+import pytest
+
+from core.point_cloud import loaders
+from core.point_cloud.loaders import PointCloudLoader
+
+def _baseline_rows(lines):
+    """The per-line parser the loaders used before np.loadtxt"""
+    points = []
+    for line in lines:
+        if line.strip():
+            coords = line.strip().replace('\t', ' ').split()
+            if len(coords) >= 3:
+                try:
+                    x, y, z = float(coords[0]), float(coords[1]), float(coords[2])
+                    if all(np.isfinite([x, y, z])):
+                        points.append([x, y, z])
+                except ValueError:
+                    continue
+    return np.array(points, dtype=np.float32).reshape(-1, 3)
+
+def _vertex_rows(count=200, seed=0):
+    rng = np.random.default_rng(seed)
+    xyz = rng.uniform(-50.0, 50.0, size=(count, 3)).astype(np.float32)
+    colors = rng.integers(0, 256, size=(count, 3))
+    rows = [f"{x!r} {y!r} {z!r} {r} {g} {b}" for (x, y, z), (r, g, b) in zip(xyz.tolist(), colors.tolist())]
+    return xyz, colors, rows
+
+# Rows the old parser dropped: non-finite values, too few columns, text
+MALFORMED_ROWS = ["nan 1.0 2.0", "1.0 inf 2.0", "1.0 2.0", "1.0 abc 2.0"]
+
+def test_xyz_ascii_matches_baseline():
+    _, _, rows = _vertex_rows()
+    rows = [row.replace(' ', '\t', 1) for row in rows[:100]] + MALFORMED_ROWS + rows[100:] + [""]
+    
+    points = PointCloudLoader.load_point_cloud("\n".join(rows).encode())
+    
+    np.testing.assert_array_equal(points, _baseline_rows(rows))
+
+def test_pcd_ascii_matches_baseline():
+    _, _, rows = _vertex_rows()
+    rows = rows[:50] + MALFORMED_ROWS + rows[50:]
+    header = [
+        "# .PCD v0.7 - Point Cloud Data file format", "VERSION 0.7",
+        "FIELDS x y z r g b", "SIZE 4 4 4 4 4 4", "TYPE F F F F F F", "COUNT 1 1 1 1 1 1",
+        f"WIDTH {len(rows)}", "HEIGHT 1", f"POINTS {len(rows)}", "DATA ascii"
+    ]
+    
+    points = PointCloudLoader.load_point_cloud("\n".join(header + rows).encode())
+    
+    np.testing.assert_array_equal(points, _baseline_rows(rows))
+
+def test_ply_ascii_matches_baseline_and_skips_faces():
+    _, _, rows = _vertex_rows()
+    rows = rows[:50] + MALFORMED_ROWS + rows[50:]
+    faces = ["3 0 1 2", "3 2 3 4"]
+    header = [
+        "ply", "format ascii 1.0", f"element vertex {len(rows)}",
+        "property float x", "property float y", "property float z",
+        "property uchar red", "property uchar green", "property uchar blue",
+        f"element face {len(faces)}", "property list uchar int vertex_indices", "end_header"
+    ]
+    
+    points = PointCloudLoader.load_point_cloud("\n".join(header + rows + faces).encode())
+    
+    np.testing.assert_array_equal(points, _baseline_rows(rows))
+
+def _binary_ply(xyz, colors, byte_order):
+    fmt = {'<': 'binary_little_endian', '>': 'binary_big_endian'}[byte_order]
+    header = "\n".join([
+        "ply", f"format {fmt} 1.0", "element camera 1", "property float focal",
+        f"element vertex {len(xyz)}",
+        "property float x", "property float y", "property float z",
+        "property uchar red", "property uchar green", "property uchar blue",
+        "end_header"
+    ]) + "\n"
+    vertex = np.zeros(len(xyz), dtype=[('x', byte_order + 'f4'), ('y', byte_order + 'f4'), ('z', byte_order + 'f4'),
+                                       ('red', 'u1'), ('green', 'u1'), ('blue', 'u1')])
+    vertex['x'], vertex['y'], vertex['z'] = xyz.T
+    vertex['red'], vertex['green'], vertex['blue'] = colors.T
+    camera = np.array([500.0], dtype=byte_order + 'f4')
+    return header.encode() + camera.tobytes() + vertex.tobytes()
+
+def test_binary_ply_matches_ascii():
+    xyz, colors, rows = _vertex_rows()
+    xyz[7] = np.nan
+    rows[7] = "nan nan nan 0 0 0"
+    ascii_points = PointCloudLoader.load_point_cloud("\n".join([
+        "ply", "format ascii 1.0", f"element vertex {len(rows)}",
+        "property float x", "property float y", "property float z",
+        "property uchar red", "property uchar green", "property uchar blue", "end_header"
+    ] + rows).encode())
+    
+    for byte_order in '<>':
+        points = PointCloudLoader.load_point_cloud(_binary_ply(xyz, colors, byte_order))
+        np.testing.assert_array_equal(points, ascii_points)
+    assert len(ascii_points) == len(xyz) - 1
+
+def test_binary_pcd_matches_ascii():
+    xyz, _, _ = _vertex_rows()
+    xyz[3] = [np.inf, 0.0, 0.0]
+    header = [
+        "# .PCD v0.7 - Point Cloud Data file format", "VERSION 0.7", "FIELDS x y z _ intensity", "SIZE 4 4 4 1 4", "TYPE F F F U F", "COUNT 1 1 1 4 1",
+        f"WIDTH {len(xyz)}", "HEIGHT 1", f"POINTS {len(xyz)}"
+    ]
+    records = np.zeros(len(xyz), dtype=[('x', '<f4'), ('y', '<f4'), ('z', '<f4'),
+                                        ('_', 'u1', (4,)), ('intensity', '<f4')])
+    records['x'], records['y'], records['z'] = xyz.T
+    records['intensity'] = 1.0
+    ascii_rows = [f"{x!r} {y!r} {z!r} 0 0 0 0 1.0" for x, y, z in xyz.tolist()]
+    
+    binary_points = PointCloudLoader.load_point_cloud(
+        ("\n".join(header + ["DATA binary"]) + "\n").encode() + records.tobytes()
+    )
+    ascii_points = PointCloudLoader.load_point_cloud("\n".join(header + ["DATA ascii"] + ascii_rows).encode())
+    
+    np.testing.assert_array_equal(binary_points, ascii_points)
+    np.testing.assert_array_equal(ascii_points, _baseline_rows(ascii_rows))
+
+@pytest.mark.parametrize("body, parts", [
+    (b"1 2 3\n4 5 6\n7 8 9", 4),
+    (b"1 2 3\n4 5 6\n7 8 9\n", 2),
+    # Cut points fall inside a line longer than a whole chunk
+    (b"1.000000001 2.000000002 3.000000003 4 5 6\n7 8 9\n", 8),
+    (b"1 2 3\n", 16),
+])
+def test_split_lines_ends_chunks_on_line_boundaries(body, parts):
+    chunks = PointCloudLoader._split_lines(body, parts)
+    
+    assert b"".join(chunks) == body
+    assert all(chunk for chunk in chunks)
+    assert all(chunk.endswith(b"\n") for chunk in chunks[:-1])
+    assert len(chunks) <= parts
+
+@pytest.fixture
+def parallel_parsing(monkeypatch):
+    """Route even small bodies through the worker processes"""
+    monkeypatch.setattr(loaders, 'PARALLEL_PARSE_MIN_BYTES', 1)
+    monkeypatch.setattr(os, 'cpu_count', lambda: 3)
+    yield
+    loaders._reset_parse_pool()
+
+def test_parallel_parse_matches_serial(parallel_parsing):
+    _, _, rows = _vertex_rows(count=301)
+    rows = rows[:100] + MALFORMED_ROWS + rows[100:] + ["", "1.0 2.0 3.0"]
+    faces = ["3 0 1 2", "3 2 3 4"]
+    xyz_body = "\n".join(rows).encode()
+    ply = "\n".join([
+        "ply", "format ascii 1.0", f"element vertex {len(rows)}",
+        "property float x", "property float y", "property float z",
+        "property uchar red", "property uchar green", "property uchar blue",
+        f"element face {len(faces)}", "property list uchar int vertex_indices", "end_header"
+    ] + rows + faces).encode()
+    
+    # Bodies are not a multiple of the worker count, so chunks are cut mid-line
+    assert len(xyz_body) % 3 != 0
+    parallel_xyz = PointCloudLoader.load_point_cloud(xyz_body)
+    parallel_ply = PointCloudLoader.load_point_cloud(ply)
+    assert loaders._parse_pool is not None
+    
+    np.testing.assert_array_equal(parallel_xyz, PointCloudLoader._parse_ascii_rows(xyz_body))
+    np.testing.assert_array_equal(parallel_xyz, _baseline_rows(rows))
+    np.testing.assert_array_equal(parallel_ply, _baseline_rows(rows))
+
+def test_parallel_parse_failure_falls_back_to_serial(parallel_parsing, monkeypatch):
+    class BrokenPool:
+        shut_down = False
+        
+        def map(self, fn, chunks):
+            raise RuntimeError("worker died")
+        
+        def shutdown(self, wait=True, cancel_futures=False):
+            self.shut_down = True
+    
+    pool = BrokenPool()
+    monkeypatch.setattr(loaders, '_parse_pool', pool)
+    _, _, rows = _vertex_rows()
+    
+    points = PointCloudLoader.load_point_cloud("\n".join(rows).encode())
+    
+    np.testing.assert_array_equal(points, _baseline_rows(rows))
+    assert pool.shut_down
+    assert loaders._parse_pool is None
+
+def test_processor_shutdown_stops_parse_workers(parallel_parsing):
+    from core.point_cloud_processor import PointCloudProcessor
+    
+    processor = PointCloudProcessor()
+    _, _, rows = _vertex_rows()
+    processor.loader.load_point_cloud("\n".join(rows).encode())
+    pool = loaders._parse_pool
+    assert pool is not None
+    
+    processor.shutdown()
+    
+    assert loaders._parse_pool is None
+    with pytest.raises(RuntimeError):
+        pool.submit(int)
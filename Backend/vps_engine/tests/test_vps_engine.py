@@ -0,0 +1,69 @@
+"""
+VPS engine tests - feature extraction batching
+"""
+
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+vps_engine = pytest.importorskip("core.vps_engine")
+
+EXTRACT_SECONDS = 0.1
+
+class PoolExtractor:
+    """Stand-in for FeatureExtractor: one pool job per image on two workers"""
+    
+    def __init__(self):
+        self.executor = ThreadPoolExecutor(max_workers=2)
+    
+    async def extract_features_batch(self, images, return_exceptions=False):
+        loop = asyncio.get_running_loop()
+        return await asyncio.gather(*[
+            loop.run_in_executor(self.executor, time.sleep, EXTRACT_SECONDS) for _ in images
+        ])
+
+def _batching_engine(monkeypatch):
+    monkeypatch.setattr(vps_engine.settings, 'VPS_MAX_BATCH', 8)
+    engine = vps_engine.VPSEngine()
+    engine.feature_extractor = PoolExtractor()
+    engine._batch_queue = asyncio.Queue()
+    engine._batch_task = asyncio.create_task(engine._feature_batch_loop())
+    return engine
+
+def test_concurrent_requests_are_not_serialized(monkeypatch):
+    async def run():
+        engine = _batching_engine(monkeypatch)
+        loop = asyncio.get_running_loop()
+        
+        async def timed_request(delay):
+            await asyncio.sleep(delay)
+            start = loop.time()
+            await engine._extract_features_batched(None)
+            return loop.time() - start
+        
+        start = loop.time()
+        latencies = await asyncio.gather(*[timed_request(i * 0.002) for i in range(4)])
+        wall = loop.time() - start
+        await engine.shutdown()
+        return latencies, wall
+    
+    latencies, wall = asyncio.run(run())
+    
+    # Two workers finish four jobs in two rounds; a request arriving while the
+    # first batch runs must take the idle worker, not wait for that batch
+    assert latencies[1] < 1.5 * EXTRACT_SECONDS
+    assert wall < 2.5 * EXTRACT_SECONDS
+
+def test_shutdown_fails_pending_requests(monkeypatch):
+    async def run():
+        engine = _batching_engine(monkeypatch)
+        pending = [asyncio.create_task(engine._extract_features_batched(None)) for _ in range(5)]
+        await asyncio.sleep(0.01)
+        await engine.shutdown()
+        return await asyncio.gather(*pending, return_exceptions=True)
+    
+    results = asyncio.run(run())
+    
+    assert all(isinstance(result, RuntimeError) for result in results)
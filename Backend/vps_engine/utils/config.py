@@ -63,6 +63,7 @@ class Settings(BaseSettings):
     MAX_CONCURRENT_LOCALIZATIONS: int = Field(default=10, description="Max concurrent localizations")
     PROCESSING_TIMEOUT: int = Field(default=30, description="Processing timeout in seconds")
     MAX_UPLOAD_SIZE: int = Field(default=50 * 1024 * 1024, description="Max upload size in bytes")  # 50MB
+    VPS_MAX_BATCH: int = Field(default=1, description="Max queued localization requests grouped per feature extraction call (1 disables batching)")
     
     # Monitoring
     ENABLE_METRICS: bool = Field(default=True, description="Enable Prometheus metrics")
@@ -71,6 +72,7 @@ class Settings(BaseSettings):
     
     # Performance tuning
     FEATURE_DETECTOR: str = Field(default="ORB", description="Feature detector (ORB/SIFT/SURF)")
+    FEATURE_DETECTOR_BACKEND: str = Field(default="cpu", description="Feature extraction backend (cpu/cuda, cuda supports ORB only)")
     MAX_FEATURES: int = Field(default=5000, description="Maximum features to extract")
     MATCHER_TYPE: str = Field(default="BF", description="Feature matcher type (BF/FLANN)")
     MATCHER_DISTANCE_THRESHOLD: float = Field(default=0.7, description="Feature matching distance threshold")